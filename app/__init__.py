@@ -7,6 +7,9 @@ from pathlib import Path
 from app.api.routes import router as api_router
 from app.core.config import settings
 from app.core.models import init_db
+from app.core.storage import storage_manager
+from app.core.transcription import requeue_jobs, preload_asr_model
+from app.core.loop_monitor import loop_monitor, LoopMonitorMiddleware
 
 def create_app():
     """
@@ -25,10 +28,27 @@ def create_app():
         name="static"
     )
     
+    # Measure event loop blocking per endpoint when diagnostics are enabled
+    if settings.LOOP_MONITOR:
+        loop_monitor.install()
+        app.add_middleware(LoopMonitorMiddleware)
+    
     # Initialize database
     init_db()
     
     # Include API router
     app.include_router(api_router)
     
+    # Resume jobs that were waiting for the scheduler when the process stopped
+    if settings.JOB_EXECUTION == "local":
+        app.router.add_event_handler("startup", requeue_jobs)
+    
+    # Keep the model warm for interactive requests instead of loading it on first use
+    if settings.PRELOAD_MODEL:
+        app.router.add_event_handler("startup", preload_asr_model)
+    
+    # Run storage lifecycle management in the background
+    app.router.add_event_handler("startup", storage_manager.start)
+    app.router.add_event_handler("shutdown", storage_manager.stop)
+    
     return app
@@ -2,18 +2,25 @@ import os
 import json
 import shutil
 import aiofiles
-from fastapi import APIRouter, Request, File, UploadFile, Form, BackgroundTasks, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import APIRouter, Request, File, UploadFile, Form, HTTPException, BackgroundTasks
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 import uuid
 import time
+import math
 
 from app.core.config import settings
-from app.core.models import TranscriptionJob, JobStatus
-from app.core.transcription import transcribe_audio, get_job_progress
-from app.core.file_processing import preprocess_audio, generate_output_file
+from app.core.models import TranscriptionJob, WorkerNode, JobStatus
+from app.core.transcription import enqueue_job, get_job_progress, retranscribe_range, load_audio, transcribe_clip, save_clip_job
+from app.core.scheduler import scheduler
+from app.core.peaks import PEAKS_FILENAME, write_peaks_file, read_peaks_header, read_peaks
+from app.core.file_processing import preprocess_audio, generate_output_file, find_processed_audio, decode_audio_bytes
+from app.core.storage import storage_manager, touch_job, get_job_usage, get_storage_usage
+from app.core.loop_monitor import loop_monitor
+from app.core.profiler import start_profiling, PROFILE_FOLDED_FILENAME, PROFILE_SUMMARY_FILENAME
 from app.utils.formatters import format_timestamp
 
 # Initialize templates
@@ -21,6 +28,9 @@ templates = Jinja2Templates(directory=Path(__file__).parent.parent / "templates"
 
 router = APIRouter()
 
+# Upper bound on the number of min/max pairs returned by /api/peaks
+MAX_PEAKS_PER_REQUEST = 4096
+
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """
@@ -55,10 +65,18 @@ async def results_page(request: Request, job_id: str):
     })
 
 @router.post("/api/upload")
-async def upload_file(request: Request, file: UploadFile = File(...)):
+async def upload_file(request: Request, file: UploadFile = File(...), client_id: Optional[str] = Form(None),
+                      priority: int = Form(0), profile: bool = Form(False)):
     """
     Upload audio file endpoint
+    
+    Jobs are scheduled fairly between clients, identified by client_id or the
+    caller's address, and a higher priority gives a larger share. With profile
+    set, the job is sampled by the profiler while it runs.
     """
+    if abs(priority) > settings.MAX_PRIORITY:
+        raise HTTPException(status_code=400, detail=f"Priority must be between {-settings.MAX_PRIORITY} and {settings.MAX_PRIORITY}")
+    
     # Generate a unique job ID
     job_id = str(uuid.uuid4())
     
@@ -66,6 +84,9 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
     job_dir = Path(settings.UPLOAD_DIR) / job_id
     os.makedirs(job_dir, exist_ok=True)
     
+    # The access marker dates the job for storage expiry from its creation
+    touch_job(job_id)
+    
     # Save the file to the job directory
     file_path = job_dir / file.filename
     
@@ -81,6 +102,9 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
             filename=file.filename,
             file_path=str(file_path),
             status=JobStatus.UPLOADED,
+            client_id=client_id or (request.client.host if request.client else None),
+            priority=priority,
+            profiling=profile,
             created_at=time.time()
         )
         job.save()
@@ -94,7 +118,7 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
 @router.post("/api/transcribe/{job_id}")
-async def start_transcription(job_id: str, background_tasks: BackgroundTasks):
+async def start_transcription(job_id: str, profile: bool = False):
     """
     Start transcription process for the uploaded file
     """
@@ -106,15 +130,74 @@ async def start_transcription(job_id: str, background_tasks: BackgroundTasks):
     if job.status != JobStatus.UPLOADED:
         return {"success": False, "message": f"Job is in {job.status} state, cannot start transcription"}
     
-    # Update job status
-    job.status = JobStatus.PREPROCESSING
-    job.save()
+    if profile:
+        job.profiling = True
+    
+    # Queue the job for worker nodes in distributed execution
+    if settings.JOB_EXECUTION == "distributed":
+        job.status = JobStatus.QUEUED
+        job.save()
+        
+        return {"success": True, "job_id": job_id, "status": job.status}
     
-    # Start transcription in background
-    background_tasks.add_task(transcribe_audio, job_id)
+    # Queue the job with the fair scheduler
+    enqueue_job(job)
     
     return {"success": True, "job_id": job_id, "status": job.status}
 
+@router.post("/api/transcribe_now")
+async def transcribe_now(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                         client_id: Optional[str] = Form(None), language: str = Form("en"), num_beams: int = Form(1)):
+    """
+    Transcribe a short clip synchronously and return its segments
+    
+    The clip is decoded in memory and run on the warm model in a slot reserved
+    for interactive requests. The job is saved after the response has been
+    sent, so its results become available shortly after under the returned ID.
+    """
+    if num_beams < 1:
+        raise HTTPException(status_code=400, detail="num_beams must be at least 1")
+    
+    start = time.perf_counter()
+    content = await file.read()
+    
+    # Decode slightly past the limit to tell clips that are too long from clips that fit
+    max_duration = min(settings.INTERACTIVE_MAX_DURATION, settings.MAX_CHUNK_DURATION)
+    try:
+        audio_data = await run_in_threadpool(decode_audio_bytes, content, max_duration + 1)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if len(audio_data) == 0:
+        raise HTTPException(status_code=400, detail="No audio found in file")
+    
+    if len(audio_data) > max_duration * 16000:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Audio is longer than {max_duration:g} seconds, use /api/upload and /api/transcribe instead"
+        )
+    
+    try:
+        results = await run_in_threadpool(transcribe_clip, audio_data, language, num_beams)
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error transcribing audio: {str(e)}")
+    
+    job_id = str(uuid.uuid4())
+    background_tasks.add_task(
+        save_clip_job, job_id, file.filename, content, audio_data, results,
+        client_id or (request.client.host if request.client else None)
+    )
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "duration": results["duration"],
+        "processing_time": time.perf_counter() - start,
+        "segments": results["segments"]
+    }
+
 @router.get("/api/status/{job_id}")
 async def check_status(job_id: str):
     """
@@ -124,13 +207,22 @@ async def check_status(job_id: str):
     if not job:
         raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
     
-    # Get progress information if available
-    progress = get_job_progress(job_id)
+    # Get progress information if available, jobs run by other nodes only report it in the database
+    progress = get_job_progress(job_id) or job.progress or 0.0
+    
+    # Estimated start time is only known for jobs scheduled by this process
+    estimate = scheduler.estimate(job_id) or {}
     
     return {
         "job_id": job_id,
         "status": job.status,
         "progress": progress,
+        "client_id": job.client_id,
+        "priority": job.priority,
+        "audio_duration": job.audio_duration,
+        "profiling": bool(job.profiling),
+        "queue_position": estimate.get("queue_position"),
+        "estimated_start_time": estimate.get("estimated_start_time"),
         "created_at": job.created_at,
         "updated_at": job.updated_at
     }
@@ -153,6 +245,8 @@ async def get_results(job_id: str):
     if not results_path.exists():
         raise HTTPException(status_code=404, detail="Results file not found")
     
+    touch_job(job_id)
+    
     # Load and return results
     with open(results_path, "r") as f:
         results = json.load(f)
@@ -176,6 +270,8 @@ async def download_results(job_id: str, format: str):
     if format not in valid_formats:
         raise HTTPException(status_code=400, detail=f"Invalid format. Supported formats: {', '.join(valid_formats)}")
     
+    touch_job(job_id)
+    
     # Generate the file if it doesn't exist
     job_dir = Path(settings.UPLOAD_DIR) / job_id
     output_path = job_dir / f"transcription.{format}"
@@ -205,6 +301,8 @@ async def get_segment_audio(job_id: str, start_time: float, end_time: float):
     if not job:
         raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
     
+    touch_job(job_id)
+    
     # Create segment directory if it doesn't exist
     job_dir = Path(settings.UPLOAD_DIR) / job_id
     segment_dir = job_dir / "segments"
@@ -239,3 +337,205 @@ async def get_segment_audio(job_id: str, start_time: float, end_time: float):
         filename=segment_filename,
         media_type="audio/wav"
     )
+
+@router.get("/api/peaks/{job_id}")
+async def get_peaks(job_id: str, zoom: Optional[int] = None, start: float = 0.0, end: Optional[float] = None):
+    """
+    Get waveform min/max peaks for a time range as int8 pairs
+    
+    Zoom 0 is the coarsest level and each step doubles the resolution. Without
+    a zoom level, the finest level that fits the range in MAX_PEAKS_PER_REQUEST
+    peaks is used. The chosen level is described in the X-Peaks-* headers.
+    """
+    job = TranscriptionJob.get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    peaks_path = job_dir / PEAKS_FILENAME
+    
+    # Jobs processed before peaks existed get them from the retained audio
+    if not peaks_path.exists():
+        audio_file = find_processed_audio(job_dir)
+        if audio_file is None:
+            raise HTTPException(status_code=404, detail="Waveform peaks not available")
+        audio_data, sampling_rate = await run_in_threadpool(load_audio, audio_file)
+        await run_in_threadpool(write_peaks_file, audio_data, sampling_rate, peaks_path)
+    
+    header = read_peaks_header(peaks_path)
+    levels = header["levels"]
+    
+    start = max(0.0, start)
+    end = header["duration"] if end is None else min(end, header["duration"])
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End must be after start and within the audio duration")
+    
+    range_samples = (end - start) * header["sample_rate"]
+    if zoom is None:
+        level_index = next(
+            (i for i, level in enumerate(levels) if range_samples / level["samples_per_peak"] <= MAX_PEAKS_PER_REQUEST),
+            len(levels) - 1
+        )
+    elif 0 <= zoom < len(levels):
+        level_index = len(levels) - 1 - zoom
+    else:
+        raise HTTPException(status_code=400, detail=f"Invalid zoom. Supported levels: 0-{len(levels) - 1}")
+    
+    level = levels[level_index]
+    start_peak = int(start * header["sample_rate"]) // level["samples_per_peak"]
+    end_peak = min(math.ceil(end * header["sample_rate"] / level["samples_per_peak"]), level["peak_count"])
+    if end_peak - start_peak > MAX_PEAKS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"Range too long for this zoom level, at most {MAX_PEAKS_PER_REQUEST} peaks per request")
+    
+    touch_job(job_id)
+    
+    return Response(
+        content=read_peaks(peaks_path, level, start_peak, end_peak),
+        media_type="application/octet-stream",
+        headers={
+            "X-Peaks-Zoom": str(len(levels) - 1 - level_index),
+            "X-Peaks-Levels": str(len(levels)),
+            "X-Peaks-Sample-Rate": str(header["sample_rate"]),
+            "X-Peaks-Samples-Per-Peak": str(level["samples_per_peak"]),
+            "X-Peaks-Start": f"{start_peak * level['samples_per_peak'] / header['sample_rate']:.6f}",
+            "X-Peaks-Duration": f"{header['duration']:.6f}",
+            "Cache-Control": "private, max-age=3600"
+        }
+    )
+
+@router.post("/api/retranscribe/{job_id}")
+async def retranscribe(job_id: str, start_time: float, end_time: float, language: str = "en", num_beams: int = 1):
+    """
+    Re-transcribe a time range of a completed job and update its results
+    """
+    job = TranscriptionJob.get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail=f"Job is in {job.status} state, results not available")
+    
+    if num_beams < 1:
+        raise HTTPException(status_code=400, detail="num_beams must be at least 1")
+    
+    touch_job(job_id)
+    
+    try:
+        revision = await run_in_threadpool(retranscribe_range, job_id, start_time, end_time, language, num_beams)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error re-transcribing audio: {str(e)}")
+    
+    return {"success": True, "job_id": job_id, **revision}
+
+@router.get("/api/nodes")
+async def list_nodes():
+    """
+    List worker nodes with their advertised capacity and liveness
+    """
+    nodes = [node.to_dict() for node in WorkerNode.get_all()]
+    
+    return {
+        "execution": settings.JOB_EXECUTION,
+        "nodes": nodes,
+        "total_capacity": sum(node["capacity"] for node in nodes if node["alive"])
+    }
+
+@router.get("/api/storage")
+async def storage_usage():
+    """
+    Get disk usage for all jobs and the configured quota
+    """
+    return await run_in_threadpool(get_storage_usage)
+
+@router.get("/api/storage/{job_id}")
+async def job_storage_usage(job_id: str):
+    """
+    Get disk usage for a single job
+    """
+    usage = await run_in_threadpool(get_job_usage, job_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    
+    return usage
+
+@router.post("/api/storage/gc")
+async def collect_storage():
+    """
+    Run a storage expiry and eviction pass immediately
+    """
+    report = await run_in_threadpool(storage_manager.collect)
+    
+    return {"success": True, "report": report}
+
+@router.post("/api/profile/{job_id}")
+async def enable_profiling(job_id: str):
+    """
+    Profile a job, from the start if it has not started yet or from now on if it is running
+    
+    A running job is sampled immediately if it runs in this process, jobs
+    running on worker nodes start being sampled at the node's next heartbeat.
+    """
+    job = TranscriptionJob.get_by_id(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+    
+    if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+        raise HTTPException(status_code=400, detail=f"Job is in {job.status} state, cannot be profiled")
+    
+    job.profiling = True
+    job.save()
+    
+    return {"success": True, "job_id": job_id, "sampling": start_profiling(job_id)}
+
+@router.get("/api/profile/{job_id}")
+async def get_profile(job_id: str):
+    """
+    Get the profile summary of a job, time per hot-path phase and top functions
+    """
+    summary_path = Path(settings.UPLOAD_DIR) / job_id / PROFILE_SUMMARY_FILENAME
+    if not summary_path.exists():
+        raise HTTPException(status_code=404, detail=f"No profile for job {job_id}")
+    
+    with open(summary_path, "r") as f:
+        summary = json.load(f)
+    
+    return {"success": True, "job_id": job_id, "profile": summary}
+
+@router.get("/api/profile/{job_id}/folded")
+async def get_profile_stacks(job_id: str):
+    """
+    Download the collapsed stacks of a job's profile, for flamegraph.pl or speedscope
+    """
+    folded_path = Path(settings.UPLOAD_DIR) / job_id / PROFILE_FOLDED_FILENAME
+    if not folded_path.exists():
+        raise HTTPException(status_code=404, detail=f"No profile for job {job_id}")
+    
+    return FileResponse(
+        path=folded_path,
+        filename=f"{job_id}.folded",
+        media_type="text/plain"
+    )
+
+@router.get("/api/debug/loop_stats")
+async def get_loop_stats():
+    """
+    Get event loop blocking time per endpoint (requires LOOP_MONITOR)
+    """
+    if not settings.LOOP_MONITOR:
+        raise HTTPException(status_code=404, detail="Loop monitor is not enabled")
+    
+    return loop_monitor.snapshot()
+
+@router.delete("/api/debug/loop_stats")
+async def reset_loop_stats():
+    """
+    Reset event loop blocking statistics
+    """
+    if not settings.LOOP_MONITOR:
+        raise HTTPException(status_code=404, detail="Loop monitor is not enabled")
+    
+    loop_monitor.reset()
+    
+    return {"success": True}
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -18,9 +19,48 @@ class Settings(BaseSettings):
     
     # NVIDIA ASR Model
     ASR_MODEL: str = "nvidia/parakeet-tdt-0.6b-v2"
+    ASR_ENGINE: str = "transformers"  # "transformers" or "stub" (deterministic fake model for load tests)
+    STUB_ASR_LATENCY: float = 0.01  # in seconds of compute per second of audio, stub engine only
     
     # Processing settings
     MAX_CHUNK_DURATION: int = 30  # in seconds, for long audio processing
+    CHUNK_OVERLAP: float = 2.0  # in seconds, between consecutive chunks, stitched by timestamps and words
+    FEATURE_CACHE: bool = True  # cache processor input features per chunk for partial re-transcription
+
+    # Storage lifecycle settings
+    STORAGE_QUOTA_BYTES: int = 10 * 1024 ** 3  # total size of UPLOAD_DIR, 0 disables eviction
+    STORAGE_GC_INTERVAL: int = 600  # in seconds, 0 disables the background collector
+    DERIVED_ARTIFACT_TTL: int = 24 * 3600  # in seconds, exports and audio segments
+    PROCESSED_AUDIO_TTL: int = 7 * 24 * 3600  # in seconds, preprocessed 16kHz audio
+    JOB_TTL: int = 0  # in seconds, whole job since last access, 0 keeps jobs forever
+    QUOTA_EVICT_JOBS: bool = False  # let quota eviction delete whole jobs once derived files and processed audio are gone
+    COMPRESS_PROCESSED_AUDIO: bool = True  # store processed audio as FLAC after transcription
+
+    # Scheduling settings
+    MAX_CONCURRENT_JOBS: int = 4  # jobs preprocessing or transcribing at once in this process
+    INFERENCE_SLOTS: int = 1  # concurrent model calls, chunks of running jobs are interleaved in fair order
+    CLIENT_MAX_CONCURRENT_JOBS: int = 2  # running jobs per client
+    MAX_PRIORITY: int = 2  # priorities range from -MAX_PRIORITY to MAX_PRIORITY, each step doubles the share
+
+    # Interactive transcription settings (/api/transcribe_now)
+    INTERACTIVE_MAX_DURATION: float = 30.0  # in seconds, longer clips must go through the job API
+    INTERACTIVE_SLOTS: int = 1  # model slots reserved for interactive requests, in addition to INFERENCE_SLOTS
+    INTERACTIVE_QUEUE_TIMEOUT: float = 10.0  # in seconds, an interactive request waiting longer for a slot fails
+    PRELOAD_MODEL: bool = True  # load the model at startup so the first request runs on a warm model
+
+    # Distributed execution settings
+    JOB_EXECUTION: str = "local"  # "local" runs jobs in the API process, "distributed" queues them for worker.py nodes
+    WORKER_NODE_ID: Optional[str] = None  # defaults to hostname and process ID
+    WORKER_CAPACITY: int = 1  # concurrent jobs per worker node
+    WORKER_POLL_INTERVAL: float = 2.0  # in seconds, between claim attempts when idle
+    JOB_LEASE_DURATION: int = 120  # in seconds, a job is re-claimed if its lease is not renewed
+    HEARTBEAT_INTERVAL: int = 15  # in seconds, between lease renewals
+    MAX_JOB_ATTEMPTS: int = 3  # claims per job before it is marked as failed
+
+    # Diagnostics
+    LOOP_MONITOR: bool = False  # measure event loop blocking time per endpoint (asyncio loop only)
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of jobs profiled without being requested, 0 disables
+    PROFILE_INTERVAL: float = 0.01  # in seconds, between stack samples of a profiled job
 
     class Config:
         env_file = ".env"
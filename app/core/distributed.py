@@ -0,0 +1,277 @@
+import os
+import time
+import socket
+import signal
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from sqlalchemy import or_, and_, func
+
+from app.core.config import settings
+from app.core.models import TranscriptionJob, WorkerNode, JobStatus, db_session
+from app.core.transcription import transcribe_audio, LOST_LEASES
+from app.core.profiler import start_profiling
+
+logger = logging.getLogger(__name__)
+
+# A job in one of these states whose lease has expired belongs to a dead node
+LEASED_STATUSES = (JobStatus.PREPROCESSING, JobStatus.PROCESSING)
+
+def claimable_filter(now: float):
+    """
+    Filter for jobs that are queued or whose lease has expired
+    """
+    return or_(
+        TranscriptionJob.status == JobStatus.QUEUED,
+        and_(
+            TranscriptionJob.status.in_(LEASED_STATUSES),
+            TranscriptionJob.lease_expires_at.isnot(None),
+            TranscriptionJob.lease_expires_at < now
+        )
+    )
+
+def claim_job(node_id: str) -> Optional[str]:
+    """
+    Claim the highest priority, oldest claimable job for a node and return its ID
+
+    On PostgreSQL the candidate row is locked with FOR UPDATE SKIP LOCKED, so
+    concurrent nodes never wait on each other and never pick the same job. The
+    lease is then taken with a conditional UPDATE, which also makes the claim
+    safe on SQLite where row locks are not available. Jobs of clients that
+    already run CLIENT_MAX_CONCURRENT_JOBS jobs across all nodes are skipped.
+    """
+    while True:
+        now = time.time()
+        try:
+            # Clients already running their share of jobs on any node wait their turn
+            busy_clients = (
+                db_session.query(TranscriptionJob.client_id)
+                .filter(
+                    TranscriptionJob.status.in_(LEASED_STATUSES),
+                    TranscriptionJob.lease_expires_at >= now,
+                    TranscriptionJob.client_id.isnot(None)
+                )
+                .group_by(TranscriptionJob.client_id)
+                .having(func.count() >= settings.CLIENT_MAX_CONCURRENT_JOBS)
+            )
+            job = (
+                db_session.query(TranscriptionJob)
+                .filter(
+                    claimable_filter(now),
+                    or_(TranscriptionJob.client_id.is_(None), TranscriptionJob.client_id.notin_(busy_clients))
+                )
+                .order_by(func.coalesce(TranscriptionJob.priority, 0).desc(), TranscriptionJob.created_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                db_session.rollback()
+                return None
+
+            job_id = job.id
+            attempts = job.attempts or 0
+            claim = db_session.query(TranscriptionJob).filter(
+                TranscriptionJob.id == job_id,
+                claimable_filter(now)
+            )
+
+            if attempts >= settings.MAX_JOB_ATTEMPTS:
+                # Repeatedly abandoned jobs are most likely crashing their nodes
+                claim.update({
+                    TranscriptionJob.status: JobStatus.FAILED,
+                    TranscriptionJob.error: f"Job lease expired after {attempts} attempts",
+                    TranscriptionJob.lease_owner: None,
+                    TranscriptionJob.lease_expires_at: None,
+                    TranscriptionJob.updated_at: now
+                }, synchronize_session=False)
+                db_session.commit()
+                logger.warning(f"Job {job_id} failed after {attempts} attempts")
+                continue
+
+            claimed = claim.update({
+                TranscriptionJob.status: JobStatus.PREPROCESSING,
+                TranscriptionJob.lease_owner: node_id,
+                TranscriptionJob.lease_expires_at: now + settings.JOB_LEASE_DURATION,
+                TranscriptionJob.attempts: func.coalesce(TranscriptionJob.attempts, 0) + 1,
+                TranscriptionJob.updated_at: now
+            }, synchronize_session=False)
+            db_session.commit()
+
+            if claimed:
+                return job_id
+
+        except Exception:
+            db_session.rollback()
+            raise
+
+def renew_leases(node_id: str, job_ids: Set[str]) -> Set[str]:
+    """
+    Extend the leases a node holds on its running jobs and return the IDs of those it still owns
+    """
+    if not job_ids:
+        return set()
+
+    owned = db_session.query(TranscriptionJob).filter(
+        TranscriptionJob.id.in_(job_ids),
+        TranscriptionJob.lease_owner == node_id
+    )
+    owned_ids = {row.id for row in owned.with_entities(TranscriptionJob.id).with_for_update().all()}
+    owned.update({
+        TranscriptionJob.lease_expires_at: time.time() + settings.JOB_LEASE_DURATION
+    }, synchronize_session=False)
+    db_session.commit()
+
+    return owned_ids
+
+def profiling_requested(job_ids: Set[str]) -> Set[str]:
+    """
+    Get the running jobs that have been flagged for profiling
+    """
+    if not job_ids:
+        return set()
+
+    rows = db_session.query(TranscriptionJob.id).filter(
+        TranscriptionJob.id.in_(job_ids),
+        TranscriptionJob.profiling.is_(True)
+    ).all()
+    db_session.commit()
+
+    return {row.id for row in rows}
+
+def release_job(node_id: str, job_id: str) -> None:
+    """
+    Release the lease on a finished job
+    """
+    db_session.query(TranscriptionJob).filter(
+        TranscriptionJob.id == job_id,
+        TranscriptionJob.lease_owner == node_id
+    ).update({
+        TranscriptionJob.lease_owner: None,
+        TranscriptionJob.lease_expires_at: None
+    }, synchronize_session=False)
+    db_session.commit()
+
+class Worker:
+    """
+    Worker node that claims queued jobs from the shared database
+
+    Jobs are claimed while fewer than `capacity` are running, and a heartbeat
+    thread renews their leases and advertises the node's capacity in the
+    worker_nodes table. If a node dies, its leases expire and other nodes
+    re-claim the jobs. Job files are read from and written to UPLOAD_DIR,
+    which must be storage shared by all nodes.
+    """
+
+    def __init__(self, node_id: Optional[str] = None, capacity: Optional[int] = None):
+        self.node_id = node_id or settings.WORKER_NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.capacity = capacity or settings.WORKER_CAPACITY
+        self.stop_event = threading.Event()
+        self._drained = threading.Event()
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+
+    def run(self) -> None:
+        """
+        Claim and run jobs until stopped, then wait for running jobs to finish
+        """
+        logger.info(f"Worker {self.node_id} started with capacity {self.capacity}")
+        self.heartbeat()
+
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True)
+        heartbeat_thread.start()
+
+        with ThreadPoolExecutor(max_workers=self.capacity, thread_name_prefix="worker-job") as executor:
+            while not self.stop_event.is_set():
+                job_id = None
+                if self.active_jobs < self.capacity:
+                    try:
+                        job_id = claim_job(self.node_id)
+                    except Exception as e:
+                        logger.error(f"Error claiming job: {str(e)}")
+
+                if job_id:
+                    logger.info(f"Worker {self.node_id} claimed job {job_id}")
+                    with self._lock:
+                        self._running.add(job_id)
+                    executor.submit(self._execute, job_id)
+                else:
+                    self.stop_event.wait(settings.WORKER_POLL_INTERVAL)
+
+        self._drained.set()
+        self.heartbeat()
+        logger.info(f"Worker {self.node_id} stopped")
+
+    def stop(self, *args) -> None:
+        """
+        Stop claiming new jobs
+        """
+        self.stop_event.set()
+
+    def install_signal_handlers(self) -> None:
+        """
+        Stop gracefully on SIGINT and SIGTERM
+        """
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+    @property
+    def active_jobs(self) -> int:
+        with self._lock:
+            return len(self._running)
+
+    def heartbeat(self) -> None:
+        """
+        Renew leases on running jobs, start profiling those flagged since they
+        were claimed and advertise this node's capacity
+        """
+        with self._lock:
+            running = set(self._running)
+
+        try:
+            # Jobs re-claimed by another node stop at their next progress update or status write
+            lost = running - renew_leases(self.node_id, running)
+            with self._lock:
+                # Finished jobs release their own lease and are no longer running
+                lost &= self._running
+                LOST_LEASES.update(lost)
+            for job_id in lost:
+                logger.warning(f"Worker {self.node_id} lost the lease on job {job_id}, stopping it")
+
+            for job_id in profiling_requested(running):
+                start_profiling(job_id)
+
+            db_session.merge(WorkerNode(
+                id=self.node_id,
+                hostname=socket.gethostname(),
+                capacity=self.capacity,
+                active_jobs=len(running),
+                heartbeat_at=time.time()
+            ))
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            logger.error(f"Error sending heartbeat: {str(e)}")
+
+    def _heartbeat_loop(self) -> None:
+        # Leases are renewed after a stop until running jobs have drained
+        while not self._drained.wait(settings.HEARTBEAT_INTERVAL):
+            self.heartbeat()
+
+    def _execute(self, job_id: str) -> None:
+        try:
+            transcribe_audio(job_id, self.node_id)
+        except Exception as e:
+            logger.error(f"Unhandled error in job {job_id}: {str(e)}")
+        finally:
+            try:
+                release_job(self.node_id, job_id)
+            except Exception as e:
+                db_session.rollback()
+                logger.error(f"Error releasing job {job_id}: {str(e)}")
+            finally:
+                db_session.remove()
+                with self._lock:
+                    LOST_LEASES.discard(job_id)
+                    self._running.discard(job_id)
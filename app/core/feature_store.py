@@ -0,0 +1,61 @@
+import os
+import hashlib
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class FeatureStore:
+    """
+    Per-job cache of processor input features, one .npy file per audio chunk
+
+    Features are keyed by the chunk's sample range and stored under a directory
+    specific to the model, so that a change of ASR_MODEL never reuses stale
+    features. Cached arrays are opened memory-mapped, which makes a cache hit
+    cost no more than the pages the model actually reads.
+    """
+
+    def __init__(self, job_dir: Path):
+        model_key = hashlib.sha1(f"{settings.ASR_ENGINE}:{settings.ASR_MODEL}".encode()).hexdigest()[:12]
+        self.directory = job_dir / "features" / model_key
+
+    def path(self, start_idx: int, end_idx: int) -> Path:
+        """
+        Get the cache file path for a chunk
+        """
+        return self.directory / f"chunk_{start_idx}_{end_idx}.npy"
+
+    def get(self, start_idx: int, end_idx: int) -> Optional[np.ndarray]:
+        """
+        Get cached features for a chunk, or None on a cache miss
+        """
+        path = self.path(start_idx, end_idx)
+        if not path.exists():
+            return None
+
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable feature cache {path}: {str(e)}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, start_idx: int, end_idx: int, features: np.ndarray) -> None:
+        """
+        Store features for a chunk
+        """
+        path = self.path(start_idx, end_idx)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partial array
+        temp_path = path.with_suffix(".tmp.npy")
+        try:
+            np.save(temp_path, np.ascontiguousarray(features))
+            os.replace(temp_path, path)
+        except OSError as e:
+            temp_path.unlink(missing_ok=True)
+            logger.warning(f"Could not cache features for {path.name}: {str(e)}")
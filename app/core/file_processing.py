@@ -3,8 +3,9 @@ import subprocess
 import tempfile
 import json
 import csv
+import numpy as np
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 def preprocess_audio(audio_file: Path) -> Path:
     """
@@ -38,6 +39,86 @@ def preprocess_audio(audio_file: Path) -> Path:
     except Exception as e:
         raise RuntimeError(f"Error preprocessing audio: {str(e)}")
 
+def decode_audio_bytes(content: bytes, max_duration: Optional[float] = None) -> np.ndarray:
+    """
+    Decode an audio file held in memory to 16kHz mono float samples
+
+    Applies the same conversion as preprocess_audio through pipes, without
+    writing to disk. Containers that need seeking, such as MP4 with its index
+    at the end, are decoded from a temporary file instead. Decoding stops after
+    max_duration seconds if given.
+    """
+    def decode(source: str, data: Optional[bytes]) -> np.ndarray:
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", source]
+        if max_duration is not None:
+            cmd += ["-t", str(max_duration)]
+        cmd += ["-ac", "1", "-ar", "16000", "-af", "dynaudnorm", "-f", "f32le", "pipe:1"]
+
+        result = subprocess.run(cmd, input=data, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return np.frombuffer(result.stdout, dtype=np.float32)
+
+    try:
+        try:
+            return decode("pipe:0", content)
+        except subprocess.CalledProcessError:
+            with tempfile.NamedTemporaryFile() as temp_file:
+                temp_file.write(content)
+                temp_file.flush()
+                return decode(temp_file.name, None)
+
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error decoding audio: {e.stderr.decode(errors='replace')}")
+
+    except Exception as e:
+        raise RuntimeError(f"Error decoding audio: {str(e)}")
+
+def estimate_audio_duration(audio_file: Path) -> float:
+    """
+    Estimate the duration of an uploaded file in seconds without decoding it
+    """
+    try:
+        import soundfile as sf
+        return sf.info(str(audio_file)).duration
+    except Exception:
+        # Unsupported container, assume 128kbps compressed audio
+        return os.path.getsize(audio_file) / 16000
+
+def compress_processed_audio(processed_file: Path) -> Path:
+    """
+    Losslessly compress processed audio to FLAC and remove the WAV file
+    """
+    compressed_file = processed_file.with_suffix(".flac")
+
+    try:
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", str(processed_file),
+            "-c:a", "flac",
+            "-compression_level", "8",
+            str(compressed_file)
+        ]
+
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        processed_file.unlink()
+
+        return compressed_file
+
+    except subprocess.CalledProcessError as e:
+        if compressed_file.exists():
+            compressed_file.unlink()
+        raise RuntimeError(f"Error compressing audio: {e.stderr.decode()}")
+
+def find_processed_audio(job_dir: Path) -> Optional[Path]:
+    """
+    Find the retained processed audio for a job, compressed or not
+    """
+    for name in ("processed_audio.wav", "processed_audio.flac"):
+        path = job_dir / name
+        if path.exists():
+            return path
+
+    return None
+
 def generate_output_file(results: Dict[str, Any], output_path: Path, format: str) -> None:
     """
     Generate output file in the specified format
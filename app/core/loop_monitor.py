@@ -0,0 +1,117 @@
+import time
+import asyncio
+import threading
+import contextvars
+from typing import Dict, Any, Optional
+
+# Endpoint that the currently running event loop callback belongs to
+current_endpoint: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_endpoint", default=None)
+
+# Callbacks holding the loop for longer than this are counted as slow, in seconds
+SLOW_CALLBACK_THRESHOLD = 0.01
+
+def endpoint_key(path: str) -> str:
+    """
+    Group a request path by endpoint, dropping job IDs and other parameters
+    """
+    parts = [part for part in path.split("/") if part]
+    if not parts:
+        return "/"
+
+    if parts[0] == "api":
+        return "/" + "/".join(parts[:2])
+
+    return "/" + parts[0]
+
+class LoopMonitor:
+    """
+    Measures how long each endpoint blocks the asyncio event loop
+
+    Every callback run by the loop is timed, and the time is attributed to the
+    endpoint stored in the callback's context. Coroutine steps of a request
+    inherit the context set by LoopMonitorMiddleware, so synchronous work done
+    inside async handlers shows up under that handler's endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._installed = False
+
+    def install(self) -> None:
+        """
+        Wrap asyncio.Handle so that loop callbacks are timed
+        """
+        if self._installed:
+            return
+
+        original_run = asyncio.events.Handle._run
+        monitor = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            try:
+                original_run(handle)
+            finally:
+                endpoint = handle._context.get(current_endpoint) if handle._context is not None else None
+                monitor.record(endpoint or "(unattributed)", time.perf_counter() - start)
+
+        asyncio.events.Handle._run = _run
+        self._installed = True
+
+    def record(self, endpoint: str, duration: float) -> None:
+        """
+        Record a single callback duration for an endpoint
+        """
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                "callbacks": 0,
+                "blocking_seconds": 0.0,
+                "max_blocking_seconds": 0.0,
+                "slow_callbacks": 0
+            })
+            stats["callbacks"] += 1
+            stats["blocking_seconds"] += duration
+            stats["max_blocking_seconds"] = max(stats["max_blocking_seconds"], duration)
+            if duration > SLOW_CALLBACK_THRESHOLD:
+                stats["slow_callbacks"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a copy of the collected statistics
+        """
+        with self._lock:
+            return {
+                "installed": self._installed,
+                "slow_callback_threshold": SLOW_CALLBACK_THRESHOLD,
+                "endpoints": {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+            }
+
+    def reset(self) -> None:
+        """
+        Clear the collected statistics
+        """
+        with self._lock:
+            self._stats.clear()
+
+class LoopMonitorMiddleware:
+    """
+    ASGI middleware that tags each HTTP request's callbacks with its endpoint
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = current_endpoint.set(endpoint_key(scope["path"]))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_endpoint.reset(token)
+
+# Shared monitor instance, installed when LOOP_MONITOR is enabled
+loop_monitor = LoopMonitor()
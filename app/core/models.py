@@ -3,7 +3,7 @@ import time
 import json
 import enum
 import sqlalchemy as sa
-from sqlalchemy import create_engine, Column, String, Float, Enum, Text
+from sqlalchemy import create_engine, Column, String, Float, Integer, Boolean, Enum, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from typing import Optional, List, Dict, Any
@@ -21,6 +21,7 @@ class JobStatus(str, enum.Enum):
     Enum for job status
     """
     UPLOADED = "uploaded"
+    QUEUED = "queued"
     PREPROCESSING = "preprocessing"
     PROCESSING = "processing"
     COMPLETED = "completed"
@@ -41,6 +42,23 @@ class TranscriptionJob(Base):
     created_at = Column(Float, default=time.time)
     updated_at = Column(Float, default=time.time, onupdate=time.time)
     
+    # Scheduling, audio_duration is estimated from the upload and exact after preprocessing
+    client_id = Column(String(255), nullable=True)
+    priority = Column(Integer, default=0)
+    audio_duration = Column(Float, nullable=True)
+    
+    # Distributed execution lease, held by the worker node running the job
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+    attempts = Column(Integer, default=0)
+    
+    # Sample the job with the profiler while it runs
+    profiling = Column(Boolean, default=False)
+    
+    __table_args__ = (
+        Index("ix_transcription_jobs_status_created_at", "status", "created_at"),
+    )
+    
     @classmethod
     def get_by_id(cls, job_id: str) -> Optional['TranscriptionJob']:
         """
@@ -66,12 +84,83 @@ class TranscriptionJob(Base):
             "status": self.status,
             "error": self.error,
             "progress": self.progress,
+            "client_id": self.client_id,
+            "priority": self.priority,
+            "audio_duration": self.audio_duration,
+            "profiling": bool(self.profiling),
             "created_at": self.created_at,
             "updated_at": self.updated_at
         }
 
+class WorkerNode(Base):
+    """
+    Model for a worker node advertising its capacity in distributed execution
+    """
+    __tablename__ = "worker_nodes"
+    
+    id = Column(String(255), primary_key=True)
+    hostname = Column(String(255), nullable=False)
+    capacity = Column(Integer, default=1)
+    active_jobs = Column(Integer, default=0)
+    started_at = Column(Float, default=time.time)
+    heartbeat_at = Column(Float, default=time.time)
+    
+    @classmethod
+    def get_all(cls) -> List['WorkerNode']:
+        """
+        Get all registered worker nodes
+        """
+        return db_session.query(cls).order_by(cls.id).all()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert worker node to dictionary
+        """
+        return {
+            "id": self.id,
+            "hostname": self.hostname,
+            "capacity": self.capacity,
+            "active_jobs": self.active_jobs,
+            "started_at": self.started_at,
+            "heartbeat_at": self.heartbeat_at,
+            "alive": self.heartbeat_at is not None and time.time() - self.heartbeat_at < settings.JOB_LEASE_DURATION
+        }
+
+def migrate_db() -> None:
+    """
+    Add columns, indexes and enum values introduced after tables were created
+    
+    create_all only creates missing tables, so existing databases are brought
+    up to date here with additive changes only.
+    """
+    inspector = sa.inspect(engine)
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(sa.text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+    
+    # Native enum types on PostgreSQL need new values added explicitly, on a
+    # fresh database the type does not exist yet and create_all creates it whole
+    if engine.dialect.name == "postgresql" and any(enum["name"] == "jobstatus" for enum in inspector.get_enums()):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for status in JobStatus:
+                conn.execute(sa.text(f"ALTER TYPE jobstatus ADD VALUE IF NOT EXISTS '{status.name}'"))
+
 def init_db() -> None:
     """
     Initialize database
     """
+    migrate_db()
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,104 @@
+import os
+import struct
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+# Name of the peaks file in the job directory
+PEAKS_FILENAME = "peaks.bin"
+
+# File layout: header, one table entry per level (finest first), then int8 min/max pairs
+PEAKS_MAGIC = b"PEAK"
+PEAKS_VERSION = 1
+HEADER_FORMAT = "<4sHHIQ"  # magic, version, level count, sample rate, total samples
+LEVEL_FORMAT = "<IIQ"  # samples per peak, peak count, data offset
+
+# Samples per peak at the finest level (16ms at 16kHz)
+BASE_SAMPLES_PER_PEAK = 256
+
+# Levels are halved until the coarsest one has at most this many peaks
+MIN_LEVEL_PEAKS = 512
+
+def compute_peak_levels(audio_data: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+    """
+    Compute a min/max peaks pyramid, finest level first
+
+    Each level is an (n, 2) int8 array of min/max pairs scaled to [-127, 127],
+    and each coarser level halves the number of peaks of the previous one.
+    """
+    samples = np.asarray(audio_data, dtype=np.float32)
+    if len(samples) == 0:
+        samples = np.zeros(1, dtype=np.float32)
+
+    # Pad with the last sample so the final partial window keeps its own extrema
+    padded_length = -(-len(samples) // BASE_SAMPLES_PER_PEAK) * BASE_SAMPLES_PER_PEAK
+    windows = np.pad(samples, (0, padded_length - len(samples)), mode="edge").reshape(-1, BASE_SAMPLES_PER_PEAK)
+    peaks = np.stack([windows.min(axis=1), windows.max(axis=1)], axis=1)
+    peaks = np.clip(np.round(peaks * 127), -127, 127).astype(np.int8)
+
+    levels = [(BASE_SAMPLES_PER_PEAK, peaks)]
+    while len(peaks) > MIN_LEVEL_PEAKS:
+        if len(peaks) % 2:
+            peaks = np.concatenate([peaks, peaks[-1:]])
+        pairs = peaks.reshape(-1, 2, 2)
+        peaks = np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+        levels.append((levels[-1][0] * 2, peaks))
+
+    return levels
+
+def write_peaks_file(audio_data: np.ndarray, sampling_rate: int, path: Path) -> None:
+    """
+    Compute the peaks pyramid for audio data and write it as a binary file
+    """
+    levels = compute_peak_levels(audio_data)
+
+    offset = struct.calcsize(HEADER_FORMAT) + struct.calcsize(LEVEL_FORMAT) * len(levels)
+    table = []
+    for samples_per_peak, peaks in levels:
+        table.append(struct.pack(LEVEL_FORMAT, samples_per_peak, len(peaks), offset))
+        offset += peaks.nbytes
+
+    # Each writer gets its own temporary file so concurrent writers never interleave
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, PEAKS_MAGIC, PEAKS_VERSION, len(levels), sampling_rate, len(audio_data)))
+            f.writelines(table)
+            for _, peaks in levels:
+                f.write(peaks.tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def read_peaks_header(path: Path) -> Dict[str, Any]:
+    """
+    Read the header and level table of a peaks file
+    """
+    with open(path, "rb") as f:
+        header = f.read(struct.calcsize(HEADER_FORMAT))
+        magic, version, level_count, sampling_rate, total_samples = struct.unpack(HEADER_FORMAT, header)
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError(f"Unsupported peaks file {path}")
+
+        levels = []
+        for _ in range(level_count):
+            samples_per_peak, peak_count, offset = struct.unpack(LEVEL_FORMAT, f.read(struct.calcsize(LEVEL_FORMAT)))
+            levels.append({"samples_per_peak": samples_per_peak, "peak_count": peak_count, "offset": offset})
+
+    return {
+        "sample_rate": sampling_rate,
+        "total_samples": total_samples,
+        "duration": total_samples / sampling_rate,
+        "levels": levels
+    }
+
+def read_peaks(path: Path, level: Dict[str, Any], start_peak: int, end_peak: int) -> bytes:
+    """
+    Read the min/max pairs in [start_peak, end_peak) of one level
+    """
+    with open(path, "rb") as f:
+        f.seek(level["offset"] + start_peak * 2)
+        return f.read((end_peak - start_peak) * 2)
@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.models import TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+# Artifacts written next to results.json
+PROFILE_FOLDED_FILENAME = "profile.folded"
+PROFILE_SUMMARY_FILENAME = "profile.json"
+
+# Stacks deeper than this are truncated at the root
+MAX_STACK_DEPTH = 128
+
+# Hot-path phases by function, a stack belongs to the phase of its innermost matching
+# frame and a marker matches a qualified name equal to it or ending with "." + marker
+PROFILE_PHASES = {
+    "FairScheduler.inference_slot": "scheduling",
+    "generate": "generate",
+    "compute_input_features": "feature_extraction",
+    "transcribe_features": "token_parsing",
+    "preprocess_audio": "ffmpeg",
+    "compress_processed_audio": "ffmpeg",
+    "update_job_progress": "database",
+    "TranscriptionJob.save": "database",
+    "load_audio": "audio_loading",
+    "write_peaks_file": "peaks",
+    "FeatureStore.get": "feature_cache",
+    "FeatureStore.put": "feature_cache",
+}
+
+def frame_phase(qualname: str) -> Optional[str]:
+    """
+    Get the hot-path phase of a function by its qualified name
+    """
+    phase = PROFILE_PHASES.get(qualname)
+    if phase is None and "." in qualname:
+        phase = PROFILE_PHASES.get(qualname.rsplit(".", 1)[-1])
+    return phase
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a single thread
+
+    A background thread reads the target thread's current frame every
+    PROFILE_INTERVAL seconds and counts collapsed stacks. The profiled thread
+    is never interrupted, so the overhead is a stack walk per sample.
+    """
+
+    def __init__(self, thread_id: int, interval: Optional[float] = None):
+        self.thread_id = thread_id
+        self.interval = interval or settings.PROFILE_INTERVAL
+        self.stacks: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._labels: Dict[Any, str] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped_at = time.time()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            del frame
+
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize samples by hot-path phase and by leaf function
+        """
+        total = sum(self.stacks.values())
+        phases: Counter = Counter()
+        leaves: Counter = Counter()
+
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            phases_in_stack = (frame_phase(frame.split(" (")[0]) for frame in reversed(frames))
+            phase = next((phase for phase in phases_in_stack if phase), "other")
+            phases[phase] += count
+            leaves[frames[-1]] += count
+
+        # Samples drift from the interval under load, so time is apportioned from wall time
+        elapsed = (self.stopped_at or time.time()) - (self.started_at or time.time())
+
+        def share(count: int) -> Dict[str, Any]:
+            fraction = count / total if total else 0.0
+            return {"samples": count, "seconds": fraction * elapsed, "fraction": fraction}
+
+        return {
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "interval": self.interval,
+            "duration": elapsed,
+            "samples": total,
+            "phases": {phase: share(count) for phase, count in phases.most_common()},
+            "top_functions": [{"function": leaf, **share(count)} for leaf, count in leaves.most_common(20)]
+        }
+
+    def write(self, job_dir: Path) -> None:
+        """
+        Write collapsed stacks (for flamegraph.pl or speedscope) and the summary
+        """
+        with open(job_dir / PROFILE_FOLDED_FILENAME, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(job_dir / PROFILE_SUMMARY_FILENAME, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+# Threads running jobs in this process and the profilers attached to them
+_lock = threading.Lock()
+_job_threads: Dict[str, int] = {}
+_profilers: Dict[str, SamplingProfiler] = {}
+
+def start_profiling(job_id: str) -> bool:
+    """
+    Start sampling a job if it is running in this process, returns whether it is being profiled
+    """
+    with _lock:
+        if job_id in _profilers:
+            return True
+
+        thread_id = _job_threads.get(job_id)
+        if thread_id is None:
+            return False
+
+        profiler = SamplingProfiler(thread_id)
+        _profilers[job_id] = profiler
+        profiler.start()
+
+    logger.info(f"Profiling job {job_id}")
+    return True
+
+@contextmanager
+def profile_job(job_id: str):
+    """
+    Register the current thread as running a job and profile it when requested
+
+    Profiling starts immediately if the job has its profiling flag set or is
+    picked by PROFILE_SAMPLE_RATE, and can be started later with
+    start_profiling while the job runs.
+    """
+    with _lock:
+        _job_threads[job_id] = threading.get_ident()
+
+    job = TranscriptionJob.get_by_id(job_id)
+    if (job and job.profiling) or random.random() < settings.PROFILE_SAMPLE_RATE:
+        start_profiling(job_id)
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _job_threads.pop(job_id, None)
+            profiler = _profilers.pop(job_id, None)
+
+        if profiler:
+            profiler.stop()
+            try:
+                profiler.write(Path(settings.UPLOAD_DIR) / job_id)
+            except OSError as e:
+                logger.warning(f"Could not write profile for job {job_id}: {str(e)}")
@@ -0,0 +1,264 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the previous estimate kept when a new processing rate is measured
+RATE_SMOOTHING = 0.8
+
+def priority_weight(priority: int) -> float:
+    """
+    Get the fair-share weight for a priority, each step doubles the share
+    """
+    priority = max(-settings.MAX_PRIORITY, min(settings.MAX_PRIORITY, priority or 0))
+    return 2.0 ** priority
+
+class FairQueue:
+    """
+    Start-time fair queue keyed by client
+
+    Each request is tagged with a virtual start time of max(virtual time, end
+    of the client's previous request) and advances its client by cost / weight.
+    Requests are served in tag order, so a client that has received little
+    service recently is served before one that has been busy, whatever their
+    arrival order.
+    """
+
+    def __init__(self):
+        self.virtual_time = 0.0
+        self._client_finish: Dict[str, float] = {}
+
+    def tag(self, client_id: str, cost: float, weight: float) -> float:
+        """
+        Tag a request and advance its client's virtual finish time
+        """
+        start = max(self.virtual_time, self._client_finish.get(client_id, 0.0))
+        self._client_finish[client_id] = start + cost / weight
+        return start
+
+    def served(self, tag: float) -> None:
+        """
+        Advance virtual time to the tag of the request being served
+        """
+        if tag <= self.virtual_time:
+            return
+
+        self.virtual_time = tag
+
+        # Clients that finished before the virtual time would be tagged at the
+        # virtual time anyway, so forget them to keep the table bounded
+        self._client_finish = {
+            client_id: finish
+            for client_id, finish in self._client_finish.items()
+            if finish > self.virtual_time
+        }
+
+    def idle(self) -> None:
+        """
+        End a busy period, virtual time jumps past every finish time so the table can be emptied
+        """
+        self.virtual_time = max(self._client_finish.values(), default=self.virtual_time)
+        self._client_finish.clear()
+
+class FairScheduler:
+    """
+    Schedules transcription jobs and their model calls across clients
+
+    Jobs are admitted in fair order by estimated audio duration, with at most
+    MAX_CONCURRENT_JOBS running in total and CLIENT_MAX_CONCURRENT_JOBS per
+    client. Running jobs then request an inference slot for every chunk, and
+    slots are also granted in fair order, so a short interactive job gets the
+    model between two chunks of a long batch job instead of after it.
+
+    Synchronous interactive requests bypass job admission entirely and use one
+    of INTERACTIVE_SLOTS reserved slots, or the next free job slot ahead of any
+    waiting chunk, so batch traffic cannot starve them.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._job_queue = FairQueue()
+        self._slot_queue = FairQueue()
+        self._pending: List[Dict[str, Any]] = []
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._waiting_slots: List[Dict[str, Any]] = []
+        self._slots_in_use = 0
+        self._interactive_slots_in_use = 0
+        self._interactive_waiting = 0
+        self._seconds_per_audio_second = 0.1
+
+    def submit(self, job_id: str, client_id: str, priority: int, estimated_duration: float,
+               runner: Callable[[str], None]) -> None:
+        """
+        Queue a job, runner(job_id) is called on its own thread once admitted
+        """
+        with self._condition:
+            weight = priority_weight(priority)
+            self._sequence += 1
+            self._pending.append({
+                "job_id": job_id,
+                "client_id": client_id,
+                "weight": weight,
+                "estimated_duration": estimated_duration,
+                "tag": self._job_queue.tag(client_id, estimated_duration, weight),
+                "sequence": self._sequence,
+                "submitted_at": time.time(),
+                "runner": runner
+            })
+            self._dispatch()
+
+    def update_estimate(self, job_id: str, duration: float) -> None:
+        """
+        Replace a running job's estimated duration once the audio has been decoded
+        """
+        with self._condition:
+            if job_id in self._running:
+                self._running[job_id]["estimated_duration"] = duration
+
+    def _dispatch(self) -> None:
+        # Called with the condition held
+        while len(self._running) < settings.MAX_CONCURRENT_JOBS:
+            running_per_client: Dict[str, int] = {}
+            for entry in self._running.values():
+                running_per_client[entry["client_id"]] = running_per_client.get(entry["client_id"], 0) + 1
+
+            admissible = [
+                entry for entry in self._pending
+                if running_per_client.get(entry["client_id"], 0) < settings.CLIENT_MAX_CONCURRENT_JOBS
+            ]
+            if not admissible:
+                return
+
+            entry = min(admissible, key=lambda e: (e["tag"], e["sequence"]))
+            self._pending.remove(entry)
+            self._job_queue.served(entry["tag"])
+
+            entry["started_at"] = time.time()
+            entry["processed"] = 0.0
+            self._running[entry["job_id"]] = entry
+
+            thread = threading.Thread(target=self._run, args=(entry,), name=f"job-{entry['job_id'][:8]}", daemon=True)
+            thread.start()
+
+    def _run(self, entry: Dict[str, Any]) -> None:
+        try:
+            entry["runner"](entry["job_id"])
+        except Exception as e:
+            logger.error(f"Unhandled error in job {entry['job_id']}: {str(e)}")
+        finally:
+            with self._condition:
+                self._running.pop(entry["job_id"], None)
+                self._dispatch()
+                if not self._pending and not self._running:
+                    self._job_queue.idle()
+
+    @contextmanager
+    def inference_slot(self, job_id: str, cost: float):
+        """
+        Hold one of INFERENCE_SLOTS model slots for a chunk of cost seconds of audio
+        """
+        with self._condition:
+            job = self._running.get(job_id)
+            client_id = job["client_id"] if job else job_id
+            weight = job["weight"] if job else 1.0
+
+            self._sequence += 1
+            request = {
+                "tag": self._slot_queue.tag(client_id, cost, weight),
+                "sequence": self._sequence
+            }
+            self._waiting_slots.append(request)
+
+            while (self._slots_in_use >= settings.INFERENCE_SLOTS
+                   or self._interactive_waiting > 0
+                   or min(self._waiting_slots, key=lambda r: (r["tag"], r["sequence"])) is not request):
+                self._condition.wait()
+
+            self._waiting_slots.remove(request)
+            self._slot_queue.served(request["tag"])
+            self._slots_in_use += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._condition:
+                self._slots_in_use -= 1
+                if cost > 0:
+                    self._seconds_per_audio_second = (
+                        RATE_SMOOTHING * self._seconds_per_audio_second + (1 - RATE_SMOOTHING) * elapsed / cost
+                    )
+                if job:
+                    job["processed"] += cost
+                if not self._waiting_slots and self._slots_in_use == 0:
+                    self._slot_queue.idle()
+                self._condition.notify_all()
+
+    @contextmanager
+    def interactive_slot(self, timeout: Optional[float] = None):
+        """
+        Hold a model slot for an interactive request, raises TimeoutError if none is free within timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._condition:
+            self._interactive_waiting += 1
+            try:
+                while (self._interactive_slots_in_use >= settings.INTERACTIVE_SLOTS
+                       and self._slots_in_use >= settings.INFERENCE_SLOTS):
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("No model slot available for interactive transcription")
+                    self._condition.wait(remaining)
+            finally:
+                self._interactive_waiting -= 1
+                self._condition.notify_all()
+
+            # Prefer a reserved slot and leave job slots to batch chunks
+            reserved = self._interactive_slots_in_use < settings.INTERACTIVE_SLOTS
+            if reserved:
+                self._interactive_slots_in_use += 1
+            else:
+                self._slots_in_use += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                if reserved:
+                    self._interactive_slots_in_use -= 1
+                else:
+                    self._slots_in_use -= 1
+                self._condition.notify_all()
+
+    def estimate(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Estimate when a job will start, or report when it started
+        """
+        with self._condition:
+            if job_id in self._running:
+                return {"queue_position": 0, "estimated_start_time": self._running[job_id]["started_at"]}
+
+            ordered = sorted(self._pending, key=lambda e: (e["tag"], e["sequence"]))
+            position = next((i for i, entry in enumerate(ordered) if entry["job_id"] == job_id), None)
+            if position is None:
+                return None
+
+            # Work ahead of the job, spread over the model slots at the measured rate
+            work_ahead = sum(
+                max(entry["estimated_duration"] - entry["processed"], 0.0)
+                for entry in self._running.values()
+            ) + sum(entry["estimated_duration"] for entry in ordered[:position])
+            wait = work_ahead * self._seconds_per_audio_second / max(settings.INFERENCE_SLOTS, 1)
+
+            return {"queue_position": position + 1, "estimated_start_time": time.time() + wait}
+
+# Shared scheduler instance for jobs run in this process
+scheduler = FairScheduler()
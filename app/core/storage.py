@@ -0,0 +1,355 @@
+import os
+import time
+import enum
+import shutil
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from app.core.config import settings
+from app.core.models import TranscriptionJob, JobStatus, db_session
+
+logger = logging.getLogger(__name__)
+
+# Marker file whose mtime records when a job was created or last read through the API
+LAST_ACCESS_MARKER = ".last_access"
+
+# Jobs in these states are waiting for or being processed and are never collected
+ACTIVE_STATUSES = (JobStatus.QUEUED, JobStatus.PREPROCESSING, JobStatus.PROCESSING)
+
+class ArtifactType(str, enum.Enum):
+    """
+    Enum for the kinds of files kept in a job directory, in eviction order
+    """
+    DERIVED = "derived"
+    PROCESSED_AUDIO = "processed_audio"
+    RESULTS = "results"
+    SOURCE = "source"
+
+def classify_artifact(relative_path: Path) -> ArtifactType:
+    """
+    Classify a file by its path relative to the job directory
+    """
+    name = relative_path.name
+
+    if relative_path.parts[0] in ("segments", "features") or name.startswith("transcription."):
+        return ArtifactType.DERIVED
+
+    if name.startswith("processed_audio."):
+        return ArtifactType.PROCESSED_AUDIO
+
+    if name in ("results.json", "peaks.bin", "profile.folded", "profile.json"):
+        return ArtifactType.RESULTS
+
+    return ArtifactType.SOURCE
+
+def get_artifact_ttl(artifact_type: ArtifactType) -> int:
+    """
+    Get the time-to-live in seconds for an artifact type (0 disables expiry)
+    """
+    if artifact_type == ArtifactType.DERIVED:
+        return settings.DERIVED_ARTIFACT_TTL
+
+    if artifact_type == ArtifactType.PROCESSED_AUDIO:
+        return settings.PROCESSED_AUDIO_TTL
+
+    return settings.JOB_TTL
+
+def touch_job(job_id: str) -> None:
+    """
+    Record an access to a job so that LRU eviction keeps it longer
+    """
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    if not job_dir.is_dir():
+        return
+
+    marker = job_dir / LAST_ACCESS_MARKER
+    try:
+        marker.touch(exist_ok=True)
+        os.utime(marker, None)
+    except OSError as e:
+        logger.warning(f"Could not record access for job {job_id}: {str(e)}")
+
+def get_last_access(job_dir: Path, job: Optional[TranscriptionJob] = None) -> float:
+    """
+    Get the last time a job was created, updated or read
+
+    The directory's own mtime is deliberately ignored, since deleting expired
+    files from it would otherwise count as an access and restart every TTL.
+    """
+    candidates = []
+
+    marker = job_dir / LAST_ACCESS_MARKER
+    if marker.exists():
+        candidates.append(marker.stat().st_mtime)
+
+    if job is not None:
+        candidates.extend(t for t in (job.created_at, job.updated_at) if t)
+
+    if not candidates:
+        # Directory without a job or marker, fall back to its newest file
+        candidates = [path.stat().st_mtime for path in job_dir.rglob("*") if path.is_file()]
+
+    return max(candidates, default=0.0)
+
+def list_artifacts(job_dir: Path) -> List[Dict[str, Any]]:
+    """
+    List all files in a job directory with their type, size and modification time
+    """
+    artifacts = []
+
+    for path in job_dir.rglob("*"):
+        if not path.is_file() or path.name == LAST_ACCESS_MARKER:
+            continue
+
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # Removed while scanning
+            continue
+
+        artifacts.append({
+            "path": path,
+            "type": classify_artifact(path.relative_to(job_dir)),
+            "size": stat.st_size,
+            "modified_at": stat.st_mtime
+        })
+
+    return artifacts
+
+def get_job_usage(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get disk usage for a single job, broken down by artifact type
+    """
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    if not job_dir.is_dir():
+        return None
+
+    job = TranscriptionJob.get_by_id(job_id)
+    artifacts = list_artifacts(job_dir)
+
+    usage = {artifact_type.value: 0 for artifact_type in ArtifactType}
+    for artifact in artifacts:
+        usage[artifact["type"].value] += artifact["size"]
+
+    return {
+        "job_id": job_id,
+        "status": job.status if job else None,
+        "total_bytes": sum(usage.values()),
+        "artifacts": usage,
+        "file_count": len(artifacts),
+        "last_accessed_at": get_last_access(job_dir, job)
+    }
+
+def get_storage_usage() -> Dict[str, Any]:
+    """
+    Get disk usage for all jobs and the totals against the configured quota
+    """
+    upload_dir = Path(settings.UPLOAD_DIR)
+    jobs = []
+
+    for job_dir in sorted(upload_dir.iterdir()) if upload_dir.exists() else []:
+        if not job_dir.is_dir():
+            continue
+
+        usage = get_job_usage(job_dir.name)
+        if usage:
+            jobs.append(usage)
+
+    totals = {artifact_type.value: 0 for artifact_type in ArtifactType}
+    for usage in jobs:
+        for artifact_type, size in usage["artifacts"].items():
+            totals[artifact_type] += size
+
+    return {
+        "total_bytes": sum(totals.values()),
+        "quota_bytes": settings.STORAGE_QUOTA_BYTES,
+        "artifacts": totals,
+        "job_count": len(jobs),
+        "jobs": jobs
+    }
+
+def delete_job(job_id: str) -> None:
+    """
+    Delete a job directory and its database record
+    """
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    if job_dir.exists():
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    job = TranscriptionJob.get_by_id(job_id)
+    if job:
+        db_session.delete(job)
+        db_session.commit()
+
+class StorageManager:
+    """
+    Background lifecycle manager for the upload directory
+
+    Each pass first expires artifacts whose TTL has elapsed since the job was
+    last accessed, then evicts least recently used artifacts until total usage
+    is below the quota. Regenerable artifacts are removed before processed
+    audio, and whole jobs are removed last.
+    """
+
+    def __init__(self, interval: Optional[int] = None):
+        self.interval = interval if interval is not None else settings.STORAGE_GC_INTERVAL
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start the background collection thread
+        """
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="storage-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background collection thread
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"Error in storage collection: {str(e)}")
+
+    def collect(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run a single expiry and quota eviction pass
+        """
+        with self._lock:
+            try:
+                return self._collect(now if now is not None else time.time())
+            finally:
+                db_session.remove()
+
+    def _collect(self, now: float) -> Dict[str, Any]:
+        report = {"expired_files": 0, "evicted_files": 0, "deleted_jobs": [], "freed_bytes": 0}
+        upload_dir = Path(settings.UPLOAD_DIR)
+        if not upload_dir.exists():
+            return report
+
+        candidates = []
+        for job_dir in upload_dir.iterdir():
+            if not job_dir.is_dir():
+                continue
+
+            job = TranscriptionJob.get_by_id(job_dir.name)
+            if job and job.status in ACTIVE_STATUSES:
+                continue
+
+            candidates.append({
+                "job_id": job_dir.name,
+                "dir": job_dir,
+                "last_access": get_last_access(job_dir, job),
+                "artifacts": list_artifacts(job_dir)
+            })
+
+        # Expire artifacts whose TTL has elapsed since the job was last accessed
+        for candidate in candidates:
+            idle = now - candidate["last_access"]
+
+            if settings.JOB_TTL > 0 and idle > settings.JOB_TTL:
+                self._delete_job(candidate, report)
+                continue
+
+            for artifact in candidate["artifacts"]:
+                ttl = get_artifact_ttl(artifact["type"])
+                if artifact["type"] in (ArtifactType.DERIVED, ArtifactType.PROCESSED_AUDIO) and ttl > 0 and idle > ttl:
+                    self._delete_file(artifact, report, "expired_files")
+
+        candidates = [c for c in candidates if not c.get("deleted")]
+
+        # Evict least recently used artifacts until usage is below the quota
+        quota = settings.STORAGE_QUOTA_BYTES
+        usage = sum(
+            artifact["size"]
+            for artifact in self._iter_remaining(candidates)
+        ) + self._active_usage(upload_dir, candidates)
+
+        if quota > 0 and usage > quota:
+            candidates.sort(key=lambda c: c["last_access"])
+
+            for artifact_type in (ArtifactType.DERIVED, ArtifactType.PROCESSED_AUDIO):
+                for candidate in candidates:
+                    for artifact in candidate["artifacts"]:
+                        if usage <= quota:
+                            break
+                        if artifact["type"] == artifact_type and not artifact.get("deleted"):
+                            self._delete_file(artifact, report, "evicted_files")
+                            usage -= artifact["size"]
+
+            for candidate in candidates:
+                if usage <= quota or not settings.QUOTA_EVICT_JOBS:
+                    break
+                usage -= sum(a["size"] for a in candidate["artifacts"] if not a.get("deleted"))
+                self._delete_job(candidate, report)
+
+        if report["expired_files"] or report["evicted_files"] or report["deleted_jobs"]:
+            logger.info(
+                f"Storage collection freed {report['freed_bytes']} bytes "
+                f"({report['expired_files']} expired, {report['evicted_files']} evicted, "
+                f"{len(report['deleted_jobs'])} jobs deleted)"
+            )
+
+        report["usage_bytes"] = max(usage, 0)
+        return report
+
+    @staticmethod
+    def _iter_remaining(candidates: List[Dict[str, Any]]):
+        for candidate in candidates:
+            for artifact in candidate["artifacts"]:
+                if not artifact.get("deleted"):
+                    yield artifact
+
+    @staticmethod
+    def _active_usage(upload_dir: Path, candidates: List[Dict[str, Any]]) -> int:
+        # Active jobs count towards the quota even though they cannot be evicted
+        collectable = {c["job_id"] for c in candidates}
+        return sum(
+            artifact["size"]
+            for job_dir in upload_dir.iterdir()
+            if job_dir.is_dir() and job_dir.name not in collectable
+            for artifact in list_artifacts(job_dir)
+        )
+
+    @staticmethod
+    def _delete_file(artifact: Dict[str, Any], report: Dict[str, Any], counter: str) -> None:
+        try:
+            artifact["path"].unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete {artifact['path']}: {str(e)}")
+            return
+
+        artifact["deleted"] = True
+        report[counter] += 1
+        report["freed_bytes"] += artifact["size"]
+
+    @staticmethod
+    def _delete_job(candidate: Dict[str, Any], report: Dict[str, Any]) -> None:
+        freed = sum(a["size"] for a in candidate["artifacts"] if not a.get("deleted"))
+        delete_job(candidate["job_id"])
+
+        for artifact in candidate["artifacts"]:
+            artifact["deleted"] = True
+        candidate["deleted"] = True
+        report["deleted_jobs"].append(candidate["job_id"])
+        report["freed_bytes"] += freed
+
+# Shared manager instance started with the application
+storage_manager = StorageManager()
@@ -2,14 +2,21 @@ import os
 import time
 import json
 import logging
-# These imports will be available in the Docker container
-# import torch
-# import numpy as np
+import re
+import contextlib
+import threading
+import weakref
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 import shutil
 import tempfile
-# from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
+
+# These imports will be available in the Docker container
+try:
+    import torch
+    from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
+except ImportError:
+    torch = None
 
 # Placeholder for Docker implementation
 import numpy as np
@@ -18,7 +25,12 @@ class DummyModule:
 
 from app.core.config import settings
 from app.core.models import TranscriptionJob, JobStatus, db_session
-from app.core.file_processing import preprocess_audio
+from app.core.file_processing import preprocess_audio, compress_processed_audio, find_processed_audio, estimate_audio_duration
+from app.core.scheduler import scheduler
+from app.core.feature_store import FeatureStore
+from app.core.peaks import write_peaks_file, PEAKS_FILENAME
+from app.core.profiler import profile_job
+from app.core.storage import touch_job
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,6 +39,46 @@ logger = logging.getLogger(__name__)
 # Global variable to store job progress
 JOB_PROGRESS = {}
 
+# Per-job locks serializing the read-modify-write of results files by re-transcription
+RESULTS_LOCKS = weakref.WeakValueDictionary()
+RESULTS_LOCKS_GUARD = threading.Lock()
+
+# Minimum number of words that must match to align overlapping windows
+STITCH_MIN_MATCH = 2
+
+# Maximum difference in seconds between the timestamps of matching words
+STITCH_TIME_TOLERANCE = 1.0
+
+# Jobs run by this worker node whose lease the heartbeat failed to renew
+LOST_LEASES = set()
+
+# Warm (processor, model, device), loaded once per process and shared by all jobs
+ASR_MODEL = None
+ASR_MODEL_LOCK = threading.Lock()
+
+class LeaseLost(Exception):
+    """
+    Raised when a worker node no longer holds the lease on the job it is running
+    """
+
+def check_lease(job_id: str, lease_owner: Optional[str]) -> None:
+    """
+    Raise LeaseLost if a job run by a worker node has been re-claimed by another node
+    
+    The job row stays locked until the next commit, so a status saved right
+    after the check cannot race a re-claim. Jobs run locally have no lease.
+    """
+    if lease_owner is None:
+        return
+    
+    owner = db_session.query(TranscriptionJob.lease_owner).filter(
+        TranscriptionJob.id == job_id
+    ).with_for_update().scalar()
+    
+    if job_id in LOST_LEASES or owner != lease_owner:
+        db_session.rollback()
+        raise LeaseLost(f"Lease on job {job_id} is no longer held by {lease_owner}")
+
 def get_job_progress(job_id: str) -> float:
     """
     Get current progress for a job
@@ -35,8 +87,11 @@ def get_job_progress(job_id: str) -> float:
 
 def update_job_progress(job_id: str, progress: float) -> None:
     """
-    Update progress for a job
+    Update progress for a job, stopping it if its lease has been lost
     """
+    if job_id in LOST_LEASES:
+        raise LeaseLost(f"Lease on job {job_id} was lost")
+    
     JOB_PROGRESS[job_id] = progress
     
     # Update database
@@ -45,9 +100,60 @@ def update_job_progress(job_id: str, progress: float) -> None:
         job.progress = progress
         job.save()
 
-def transcribe_audio(job_id: str) -> None:
+def enqueue_job(job: TranscriptionJob) -> None:
+    """
+    Queue a job with the fair scheduler to be transcribed in this process
+    """
+    audio_file = Path(settings.UPLOAD_DIR) / job.id / Path(job.file_path).name
+    if job.audio_duration is None:
+        job.audio_duration = estimate_audio_duration(audio_file)
+    
+    job.status = JobStatus.QUEUED
+    job.save()
+    
+    scheduler.submit(job.id, job.client_id or job.id, job.priority or 0, job.audio_duration, transcribe_audio)
+
+def requeue_jobs() -> None:
+    """
+    Queue jobs left waiting by a previous run of this process
+    """
+    try:
+        jobs = db_session.query(TranscriptionJob).filter(
+            TranscriptionJob.status == JobStatus.QUEUED
+        ).order_by(TranscriptionJob.created_at).all()
+        
+        for job in jobs:
+            enqueue_job(job)
+        
+        if jobs:
+            logger.info(f"Requeued {len(jobs)} waiting job(s)")
+    finally:
+        db_session.remove()
+
+def get_results_lock(job_id: str) -> threading.Lock:
+    """
+    Get the lock for updating a job's results file, shared while anyone holds it
+    """
+    with RESULTS_LOCKS_GUARD:
+        lock = RESULTS_LOCKS.get(job_id)
+        if lock is None:
+            lock = threading.Lock()
+            RESULTS_LOCKS[job_id] = lock
+        return lock
+
+def transcribe_audio(job_id: str, lease_owner: Optional[str] = None) -> None:
     """
-    Main function to preprocess and transcribe audio file
+    Main function to preprocess and transcribe audio file, profiled when requested
+    """
+    with profile_job(job_id):
+        run_transcription(job_id, lease_owner)
+
+def run_transcription(job_id: str, lease_owner: Optional[str] = None) -> None:
+    """
+    Preprocess and transcribe the audio file of a job
+    
+    A job run by a worker node under a lease stops, without writing its
+    results or status, as soon as the lease turns out to have been lost.
     """
     logger.info(f"Starting transcription for job {job_id}")
     
@@ -64,9 +170,16 @@ def transcribe_audio(job_id: str) -> None:
         
         # Preprocess audio file
         logger.info(f"Preprocessing audio for job {job_id}")
-        audio_file = Path(job.file_path)
+        # Resolve against the local UPLOAD_DIR, worker nodes may mount shared storage elsewhere
+        audio_file = Path(settings.UPLOAD_DIR) / job_id / Path(job.file_path).name
         processed_file = preprocess_audio(audio_file)
         
+        check_lease(job_id, lease_owner)
+        
+        # The exact duration refines the scheduler's start time estimates
+        job.audio_duration = get_audio_duration(processed_file)
+        scheduler.update_estimate(job_id, job.audio_duration)
+        
         # Update job status
         job.status = JobStatus.PROCESSING
         job.save()
@@ -75,24 +188,46 @@ def transcribe_audio(job_id: str) -> None:
         logger.info(f"Running transcription for job {job_id}")
         results = run_asr_model(processed_file, job_id)
         
+        # Only the lease owner may write the results, the commit releases the row lock
+        check_lease(job_id, lease_owner)
+        db_session.commit()
+        
         # Save results
         results_path = Path(settings.UPLOAD_DIR) / job_id / "results.json"
         with open(results_path, "w") as f:
             json.dump(results, f, indent=2)
         
+        # Retain processed audio losslessly compressed to save disk space
+        if settings.COMPRESS_PROCESSED_AUDIO:
+            try:
+                compress_processed_audio(processed_file)
+            except Exception as e:
+                logger.warning(f"Could not compress processed audio for job {job_id}: {str(e)}")
+        
         # Update job status
+        check_lease(job_id, lease_owner)
         job.status = JobStatus.COMPLETED
         job.save()
         
         logger.info(f"Transcription completed for job {job_id}")
     
+    except LeaseLost as e:
+        # The node that re-claimed the job now owns its files and status
+        logger.warning(f"Stopped transcription for job {job_id}: {str(e)}")
+        JOB_PROGRESS.pop(job_id, None)
+    
     except Exception as e:
         logger.error(f"Error in transcription for job {job_id}: {str(e)}")
         
-        # Update job status
-        job.status = JobStatus.FAILED
-        job.error = str(e)
-        job.save()
+        # Update job status, unless another node has taken the job over
+        db_session.rollback()
+        try:
+            check_lease(job_id, lease_owner)
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            job.save()
+        except LeaseLost as lease_error:
+            logger.warning(f"Not marking job {job_id} as failed: {str(lease_error)}")
         
         # Clean up progress tracking
         if job_id in JOB_PROGRESS:
@@ -105,59 +240,51 @@ def run_asr_model(audio_file: Path, job_id: str) -> Dict[str, Any]:
     # Initialize model and processor
     update_job_progress(job_id, 5.0)
     
-    logger.info("Loading ASR model and processor")
-    processor = AutoProcessor.from_pretrained(settings.ASR_MODEL)
-    model = AutoModelForSpeechSeq2Seq.from_pretrained(settings.ASR_MODEL)
-    
-    # Check if GPU is available
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = model.to(device)
+    processor, model, device = load_asr_model()
     
     update_job_progress(job_id, 10.0)
     
     # For long audio, we'll need to split it into chunks
     # First, load the audio data
-    import librosa
     logger.info(f"Loading audio file {audio_file}")
-    audio_data, sampling_rate = librosa.load(str(audio_file), sr=16000)
+    audio_data, sampling_rate = load_audio(audio_file)
     
     # Calculate total duration
     duration = len(audio_data) / sampling_rate
     logger.info(f"Audio duration: {duration:.2f} seconds")
     
-    # Split audio into chunks if needed
-    chunk_size = settings.MAX_CHUNK_DURATION * sampling_rate
+    # Precompute waveform peaks from the decoded audio for the results page
+    try:
+        write_peaks_file(audio_data, sampling_rate, audio_file.parent / PEAKS_FILENAME)
+    except Exception as e:
+        logger.warning(f"Could not write waveform peaks for job {job_id}: {str(e)}")
     
-    if len(audio_data) <= chunk_size:
-        # Process entire audio at once
-        segments = process_audio_chunk(audio_data, processor, model, device)
-        results = {"segments": segments, "duration": duration}
-    else:
-        # Process in chunks
-        all_segments = []
-        chunk_count = (len(audio_data) + chunk_size - 1) // chunk_size
-        
-        for i in range(chunk_count):
-            logger.info(f"Processing chunk {i+1}/{chunk_count}")
+    # Split audio into overlapping windows if needed
+    windows = chunk_windows(len(audio_data), sampling_rate)
+    
+    # Cache input features so that partial re-transcription can skip extraction
+    feature_store = FeatureStore(audio_file.parent) if settings.FEATURE_CACHE else None
+    
+    def report_window(i: int, window_count: int) -> None:
+        if window_count > 1:
+            logger.info(f"Processing chunk {i+1}/{window_count}")
             
             # Calculate progress based on chunks
-            progress = 10.0 + (i / chunk_count) * 85.0
-            update_job_progress(job_id, progress)
-            
-            # Get chunk
-            start_idx = i * chunk_size
-            end_idx = min(start_idx + chunk_size, len(audio_data))
-            chunk = audio_data[start_idx:end_idx]
-            
-            # Process chunk
-            offset = start_idx / sampling_rate
-            segments = process_audio_chunk(chunk, processor, model, device, offset)
-            all_segments.extend(segments)
-        
+            update_job_progress(job_id, 10.0 + (i / window_count) * 85.0)
+    
+    segments = transcribe_windows(
+        job_id,
+        windows,
+        lambda start_idx, end_idx: audio_data[start_idx:end_idx],
+        processor, model, device, feature_store,
+        on_window=report_window
+    )
+    
+    if len(windows) > 1:
         # Merge adjacent segments if they belong together
-        all_segments = merge_adjacent_segments(all_segments)
-        
-        results = {"segments": all_segments, "duration": duration}
+        segments = merge_adjacent_segments(segments)
+    
+    results = {"segments": segments, "duration": duration}
     
     # Add word-level timing if available
     for segment in results["segments"]:
@@ -168,20 +295,305 @@ def run_asr_model(audio_file: Path, job_id: str) -> Dict[str, Any]:
     update_job_progress(job_id, 100.0)
     return results
 
+def retranscribe_range(job_id: str, start_time: float, end_time: float,
+                       language: str = "en", num_beams: int = 1) -> Dict[str, Any]:
+    """
+    Re-transcribe a time range of a completed job and splice the new segments into its results
+    
+    The range is widened to the boundaries of any segments it cuts through, and
+    windows are taken from the same grid as the original run so that their
+    cached input features are reused. Audio is only decoded for windows missing
+    from the feature store, and ffmpeg only runs if the processed audio has been
+    evicted. Only splicing the new segments into the results file is done
+    under the job's results lock, so re-runs never wait on each other's model
+    calls.
+    """
+    job = TranscriptionJob.get_by_id(job_id)
+    if not job:
+        raise ValueError(f"Job {job_id} not found")
+    
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    results_path = job_dir / "results.json"
+    
+    with open(results_path, "r") as f:
+        results = json.load(f)
+    
+    duration = results["duration"]
+    start_time = max(0.0, start_time)
+    end_time = min(end_time, duration)
+    if end_time <= start_time:
+        raise ValueError("End time must be after start time and within the audio duration")
+    
+    # Widen the range to the boundaries of the segments it cuts through
+    for segment in results["segments"]:
+        if segment["start"] < start_time < segment["end"]:
+            start_time = segment["start"]
+        if segment["start"] < end_time < segment["end"]:
+            end_time = segment["end"]
+    
+    # Use the windows of the original run so cached features line up
+    sampling_rate = 16000
+    total_samples = int(round(duration * sampling_rate))
+    windows = [
+        (start_idx, end_idx) for start_idx, end_idx in chunk_windows(total_samples, sampling_rate)
+        if start_idx < end_time * sampling_rate and end_idx > start_time * sampling_rate
+    ]
+    
+    processor, model, device = load_asr_model()
+    audio_files = []
+    
+    def load_chunk(start_idx: int, end_idx: int) -> np.ndarray:
+        # Audio is only needed for windows missing from the feature store
+        if not audio_files:
+            audio_files.append(find_processed_audio(job_dir) or preprocess_audio(job_dir / Path(job.file_path).name))
+        chunk, _ = load_audio(audio_files[0], start_idx, end_idx)
+        return chunk
+    
+    segments = transcribe_windows(
+        job_id, windows, load_chunk, processor, model, device, FeatureStore(job_dir),
+        language=language, num_beams=num_beams
+    )
+    # Windows extend past the range, keep only the words transcribed inside it
+    new_segments = merge_adjacent_segments(clip_segments(segments, start_time, end_time, inside=True))
+    for segment in new_segments:
+        if "words" not in segment:
+            segment["words"] = estimate_word_timings(segment["text"], segment["start"], segment["end"])
+    
+    with get_results_lock(job_id):
+        # Re-read so that concurrent re-runs of other ranges are kept
+        with open(results_path, "r") as f:
+            results = json.load(f)
+        
+        results["segments"] = splice_segments(results["segments"], new_segments, start_time, end_time)
+        results.setdefault("revisions", []).append({
+            "start": start_time,
+            "end": end_time,
+            "language": language,
+            "num_beams": num_beams,
+            "created_at": time.time()
+        })
+        
+        temp_path = results_path.with_suffix(".json.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(results, f, indent=2)
+        os.replace(temp_path, results_path)
+        
+        # Exports generated from the old results are now stale
+        for export in job_dir.glob("transcription.*"):
+            export.unlink(missing_ok=True)
+
+    return {"start": start_time, "end": end_time, "segments": new_segments}
+
+def transcribe_clip(audio_data: np.ndarray, language: str = "en", num_beams: int = 1,
+                    sampling_rate: int = 16000) -> Dict[str, Any]:
+    """
+    Transcribe a short clip held in memory on the warm model
+    
+    The clip is transcribed as a single window in an interactive model slot,
+    so it neither waits for job admission nor queues behind batch chunks.
+    """
+    processor, model, device = load_asr_model()
+    features = compute_input_features(audio_data, processor)
+    
+    with scheduler.interactive_slot(timeout=settings.INTERACTIVE_QUEUE_TIMEOUT):
+        segments = transcribe_features(features, processor, model, device, 0.0, language, num_beams)
+    
+    for segment in segments:
+        if "words" not in segment:
+            segment["words"] = estimate_word_timings(segment["text"], segment["start"], segment["end"])
+    
+    return {"segments": segments, "duration": len(audio_data) / sampling_rate}
+
+def save_clip_job(job_id: str, filename: str, content: bytes, audio_data: np.ndarray, results: Dict[str, Any],
+                  client_id: Optional[str] = None, sampling_rate: int = 16000) -> None:
+    """
+    Persist a clip transcribed by transcribe_clip as a completed job
+    
+    The job gets the same files as one run through transcribe_audio, so its
+    results, exports, audio segments, waveform and re-transcription all work.
+    """
+    import soundfile as sf
+    
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    os.makedirs(job_dir, exist_ok=True)
+    touch_job(job_id)
+    
+    try:
+        file_path = job_dir / Path(filename).name
+        with open(file_path, "wb") as f:
+            f.write(content)
+        
+        processed_file = job_dir / "processed_audio.wav"
+        sf.write(str(processed_file), audio_data, sampling_rate, subtype="PCM_16")
+        
+        write_peaks_file(audio_data, sampling_rate, job_dir / PEAKS_FILENAME)
+        
+        with open(job_dir / "results.json", "w") as f:
+            json.dump(results, f, indent=2)
+        
+        if settings.COMPRESS_PROCESSED_AUDIO:
+            try:
+                compress_processed_audio(processed_file)
+            except Exception as e:
+                logger.warning(f"Could not compress processed audio for job {job_id}: {str(e)}")
+        
+        job = TranscriptionJob(
+            id=job_id,
+            filename=filename,
+            file_path=str(file_path),
+            status=JobStatus.COMPLETED,
+            progress=100.0,
+            client_id=client_id,
+            audio_duration=results["duration"],
+            created_at=time.time()
+        )
+        job.save()
+    
+    except Exception as e:
+        logger.error(f"Error saving interactive job {job_id}: {str(e)}")
+        db_session.rollback()
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+def load_asr_model() -> Tuple[Any, Any, str]:
+    """
+    Get the ASR processor and model for the configured engine, loading them on first use
+    """
+    global ASR_MODEL
+    
+    with ASR_MODEL_LOCK:
+        if ASR_MODEL is not None:
+            return ASR_MODEL
+        
+        if settings.ASR_ENGINE == "stub":
+            from app.core.stub_asr import StubProcessor, StubModel
+            
+            logger.info("Loading stub ASR engine")
+            ASR_MODEL = (StubProcessor(), StubModel(), "cpu")
+            return ASR_MODEL
+        
+        logger.info("Loading ASR model and processor")
+        processor = AutoProcessor.from_pretrained(settings.ASR_MODEL)
+        model = AutoModelForSpeechSeq2Seq.from_pretrained(settings.ASR_MODEL)
+        
+        # Check if GPU is available
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model = model.to(device)
+        
+        ASR_MODEL = (processor, model, device)
+        return ASR_MODEL
+
+def preload_asr_model() -> None:
+    """
+    Load the ASR model in the background so that the first request finds it warm
+    """
+    def load() -> None:
+        try:
+            load_asr_model()
+        except Exception as e:
+            logger.error(f"Error preloading ASR model: {str(e)}")
+    
+    threading.Thread(target=load, name="model-preload", daemon=True).start()
+
+def load_audio(audio_file: Path, start_idx: int = 0, end_idx: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    Load processed 16kHz audio, optionally only the samples in [start_idx, end_idx)
+    """
+    import soundfile as sf
+    
+    audio_data, sampling_rate = sf.read(str(audio_file), start=start_idx, stop=end_idx, dtype="float32", always_2d=True)
+    
+    # Processed audio is mono, downmix anything else
+    return audio_data.mean(axis=1), sampling_rate
+
+def get_audio_duration(audio_file: Path) -> float:
+    """
+    Get the duration of processed audio in seconds from its header
+    """
+    import soundfile as sf
+    
+    return sf.info(str(audio_file)).duration
+
+def compute_input_features(audio_data: np.ndarray, processor) -> np.ndarray:
+    """
+    Run the processor's feature extraction on a chunk of audio data
+    """
+    inputs = processor(audio_data, sampling_rate=16000, return_tensors="np")
+    return np.asarray(inputs.input_features)
+
+def chunk_windows(total_samples: int, sampling_rate: int = 16000) -> List[Tuple[int, int]]:
+    """
+    Split audio into windows of MAX_CHUNK_DURATION that overlap by CHUNK_OVERLAP
+    """
+    chunk_size = int(settings.MAX_CHUNK_DURATION * sampling_rate)
+    overlap = int(min(settings.CHUNK_OVERLAP, settings.MAX_CHUNK_DURATION / 2) * sampling_rate)
+    stride = chunk_size - overlap
+    
+    windows = []
+    start_idx = 0
+    while True:
+        end_idx = min(start_idx + chunk_size, total_samples)
+        windows.append((start_idx, end_idx))
+        if end_idx >= total_samples:
+            return windows
+        start_idx += stride
+
+def transcribe_windows(job_id: str, windows: List[Tuple[int, int]], load_chunk: Callable[[int, int], np.ndarray],
+                       processor, model, device: str, feature_store: Optional[FeatureStore] = None,
+                       on_window: Optional[Callable[[int, int], None]] = None,
+                       sampling_rate: int = 16000, **generate_options: Any) -> List[Dict[str, Any]]:
+    """
+    Transcribe consecutive windows and stitch their segments at the overlaps
+    
+    Input features come from the feature store when cached, otherwise the
+    window's audio is requested from load_chunk and its features are stored.
+    """
+    stitched = []
+    previous_end = None
+    
+    for i, (start_idx, end_idx) in enumerate(windows):
+        if on_window:
+            on_window(i, len(windows))
+        
+        features = feature_store.get(start_idx, end_idx) if feature_store is not None else None
+        if features is None:
+            features = compute_input_features(load_chunk(start_idx, end_idx), processor)
+            if feature_store is not None:
+                feature_store.put(start_idx, end_idx, features)
+        
+        # Wait for a model slot, chunks of other jobs may be scheduled in between
+        with scheduler.inference_slot(job_id, (end_idx - start_idx) / sampling_rate):
+            segments = transcribe_features(features, processor, model, device, start_idx / sampling_rate, **generate_options)
+        
+        if previous_end is not None and start_idx < previous_end:
+            stitched = stitch_segments(stitched, segments, start_idx / sampling_rate, previous_end / sampling_rate)
+        else:
+            stitched.extend(segments)
+        previous_end = end_idx
+    
+    return stitched
+
 def process_audio_chunk(audio_data: np.ndarray, processor, model, device: str, offset: float = 0.0) -> List[Dict[str, Any]]:
     """
     Process a chunk of audio data with the ASR model
     """
-    # Prepare inputs
-    inputs = processor(audio_data, sampling_rate=16000, return_tensors="pt")
-    inputs = inputs.to(device)
+    features = compute_input_features(audio_data, processor)
+    return transcribe_features(features, processor, model, device, offset)
+
+def transcribe_features(input_features: np.ndarray, processor, model, device: str, offset: float = 0.0,
+                        language: str = "en", num_beams: int = 1) -> List[Dict[str, Any]]:
+    """
+    Run the ASR model on precomputed input features and parse timestamped segments
+    """
+    if torch is not None:
+        input_features = torch.from_numpy(np.ascontiguousarray(input_features)).to(device)
     
     # Generate outputs
-    with torch.no_grad():
+    with torch.no_grad() if torch is not None else contextlib.nullcontext():
         outputs = model.generate(
-            inputs.input_features, 
-            language="en",
+            input_features, 
+            language=language,
             task="transcribe",
+            num_beams=num_beams,
             return_timestamps=True
         )
     
@@ -246,6 +658,8 @@ def merge_adjacent_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, An
             # Merge with current segment
             current["end"] = segment["end"]
             current["text"] += " " + segment["text"]
+            if "words" in current or "words" in segment:
+                current["words"] = current.get("words", []) + segment.get("words", [])
         else:
             # Add current to merged list and start a new current
             merged.append(current)
@@ -256,6 +670,180 @@ def merge_adjacent_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, An
     
     return merged
 
+def normalize_word(word: str) -> str:
+    """
+    Normalize a word for comparing transcripts of overlapping windows
+    """
+    return re.sub(r"[^\w']", "", word.lower())
+
+def find_overlap_match(tail: List[Dict[str, Any]], head: List[Dict[str, Any]],
+                       tolerance: float) -> Optional[Tuple[int, int]]:
+    """
+    Find the longest run of words shared by the end of one window and the start of the next
+    
+    Returns the index of the run in tail and in head, or None if no run of at
+    least STITCH_MIN_MATCH words starts within tolerance seconds in both.
+    """
+    tail_words = [normalize_word(word["word"]) for word in tail]
+    head_words = [normalize_word(word["word"]) for word in head]
+    best = None
+    best_length = STITCH_MIN_MATCH - 1
+    
+    for i in range(len(tail_words)):
+        for j in range(len(head_words)):
+            if abs(tail[i]["start"] - head[j]["start"]) > tolerance:
+                continue
+            
+            length = 0
+            while (i + length < len(tail_words) and j + length < len(head_words)
+                   and tail_words[i + length] and tail_words[i + length] == head_words[j + length]):
+                length += 1
+            
+            if length > best_length:
+                best, best_length = (i, j), length
+    
+    return best
+
+def stitch_segments(stitched: List[Dict[str, Any]], segments: List[Dict[str, Any]],
+                    overlap_start: float, overlap_end: float) -> List[Dict[str, Any]]:
+    """
+    Append the segments of a window to those of the previous windows, removing words transcribed twice
+    
+    Words in the overlap are aligned by text and timestamps, and the new window
+    takes over from the first matching word. Without a match, each window keeps
+    the words closest to its own center, split at the middle of the overlap.
+    """
+    # Only segments that reach into the overlap can contain duplicated words
+    prefix = [segment for segment in stitched if segment["end"] <= overlap_start]
+    tail_segments = [segment for segment in stitched if segment["end"] > overlap_start]
+    head_segments = [segment for segment in segments if segment["start"] < overlap_end]
+    suffix = [segment for segment in segments if segment["start"] >= overlap_end]
+    
+    # Estimated timings must cover the whole segment for a cut by time to be meaningful
+    for segment in tail_segments + head_segments:
+        if "words" not in segment:
+            segment["words"] = spread_word_timings(segment["text"], segment["start"], segment["end"])
+    
+    tail = [word for segment in tail_segments for word in segment["words"]]
+    head = [word for segment in head_segments for word in segment["words"]]
+    
+    # Word timings are often estimated from segment bounds, so allow for the whole overlap
+    match = find_overlap_match(tail, head, overlap_end - overlap_start + STITCH_TIME_TOLERANCE)
+    if match:
+        dropped = tail[match[0]:] + head[:match[1]]
+    else:
+        cut = (overlap_start + overlap_end) / 2
+        dropped = [word for word in tail if (word["start"] + word["end"]) / 2 >= cut]
+        dropped += [word for word in head if (word["start"] + word["end"]) / 2 < cut]
+    dropped_ids = {id(word) for word in dropped}
+    
+    def trim(segment_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        trimmed = []
+        for segment in segment_list:
+            words = [word for word in segment["words"] if id(word) not in dropped_ids]
+            if len(words) == len(segment["words"]):
+                trimmed.append(segment)
+            elif words:
+                trimmed.append({
+                    **segment,
+                    "start": words[0]["start"],
+                    "end": words[-1]["end"],
+                    "text": " ".join(word["word"] for word in words),
+                    "words": words
+                })
+        return trimmed
+    
+    return prefix + trim(tail_segments) + trim(head_segments) + suffix
+
+def spread_word_timings(text: str, start_time: float, end_time: float) -> List[Dict[str, Any]]:
+    """
+    Estimate word timings spanning a whole segment, in proportion to word length
+    """
+    words = text.strip().split()
+    if not words:
+        return []
+    
+    seconds_per_char = (end_time - start_time) / sum(len(word) + 1 for word in words)
+    
+    word_timings = []
+    current_time = start_time
+    for word in words:
+        word_timings.append({
+            "word": word,
+            "start": current_time,
+            "end": current_time + (len(word) + 1) * seconds_per_char
+        })
+        current_time = word_timings[-1]["end"]
+    
+    word_timings[-1]["end"] = end_time
+    return word_timings
+
+def clip_segments(segments: List[Dict[str, Any]], start_time: float, end_time: float,
+                  inside: bool) -> List[Dict[str, Any]]:
+    """
+    Keep the words of segments whose middle falls inside (or outside) a time range
+    
+    Segments crossing an edge of the range are cut at word level and their
+    bounds clamped to the edge, a segment spanning the whole range with
+    inside=False is split in two.
+    """
+    clipped = []
+    
+    for segment in segments:
+        words = segment.get("words") or spread_word_timings(segment["text"], segment["start"], segment["end"])
+        if not words:
+            middle = (segment["start"] + segment["end"]) / 2
+            if (start_time <= middle <= end_time) == inside:
+                clipped.append(segment)
+            continue
+        
+        # Consecutive runs of kept words, a run is broken by the range on the outside
+        runs = [[]]
+        for word in words:
+            if (start_time <= (word["start"] + word["end"]) / 2 <= end_time) == inside:
+                runs[-1].append(word)
+            elif runs[-1]:
+                runs.append([])
+        runs = [run for run in runs if run]
+        
+        if len(runs) == 1 and len(runs[0]) == len(words):
+            clipped.append({**segment, "words": words})
+            continue
+        
+        for run in runs:
+            run_start, run_end = run[0]["start"], run[-1]["end"]
+            if inside:
+                run_start, run_end = max(run_start, start_time), min(run_end, end_time)
+            elif run_end <= end_time:
+                run_end = min(run_end, start_time)
+            else:
+                run_start = max(run_start, end_time)
+            
+            run = [dict(word) for word in run]
+            run[0]["start"], run[-1]["end"] = run_start, run_end
+            clipped.append({
+                **segment,
+                "start": run_start,
+                "end": run_end,
+                "text": " ".join(word["word"] for word in run),
+                "words": run
+            })
+    
+    return clipped
+
+def splice_segments(segments: List[Dict[str, Any]], new_segments: List[Dict[str, Any]],
+                    start_time: float, end_time: float) -> List[Dict[str, Any]]:
+    """
+    Replace the words of a time range with those of newly transcribed segments
+    
+    Both sides are cut at word level, so segments from a run with different
+    settings may cross the range edges without losing or duplicating text.
+    """
+    kept = clip_segments(segments, start_time, end_time, inside=False)
+    added = clip_segments(new_segments, start_time, end_time, inside=True)
+    
+    return sorted(kept + added, key=lambda segment: segment["start"])
+
 def estimate_word_timings(text: str, start_time: float, end_time: float) -> List[Dict[str, Any]]:
     """
     Estimate word timings for a segment when the model doesn't provide them
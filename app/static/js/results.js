@@ -10,6 +10,13 @@ document.addEventListener('DOMContentLoaded', function() {
     const loadingSpinner = document.getElementById('loading-spinner');
     const errorAlert = document.getElementById('error-alert');
     
+    const waveformContainer = document.getElementById('waveform-container');
+    const waveformCanvas = document.getElementById('waveform-canvas');
+    const waveformRange = document.getElementById('waveform-range');
+    
+    // Visible waveform window in seconds, set once the first peaks arrive
+    const waveform = { start: 0, end: null, duration: null, zoom: null, levels: null };
+    
     // Start polling for status if job is not completed
     if (jobId) {
         fetchJobStatus();
@@ -44,7 +51,13 @@ document.addEventListener('DOMContentLoaded', function() {
                         hideLoading();
                     } else {
                         statusBadge.classList.add('bg-info');
-                        
+
+                        // Show queue position and estimated start while waiting
+                        if (data.status === 'queued' && data.queue_position) {
+                            const startsAt = new Date(data.estimated_start_time * 1000).toLocaleTimeString();
+                            statusBadge.textContent = `queued (#${data.queue_position}, starts ~${startsAt})`;
+                        }
+
                         // Update progress if available
                         if (data.progress) {
                             const progressBar = document.getElementById('progress-bar');
@@ -84,6 +97,9 @@ document.addEventListener('DOMContentLoaded', function() {
                     // Display results
                     displayResults(data.results);
                     
+                    // Draw the waveform overview
+                    loadWaveform(0, null, null);
+                    
                     // Show download links
                     const downloadSection = document.getElementById('download-section');
                     if (downloadSection) {
@@ -221,6 +237,113 @@ document.addEventListener('DOMContentLoaded', function() {
         return html;
     }
     
+    /**
+     * Fetch waveform peaks for a time range and draw them
+     */
+    function loadWaveform(start, end, zoom) {
+        if (!waveformCanvas) return;
+        
+        const params = new URLSearchParams({ start: start });
+        if (end !== null) params.set('end', end);
+        if (zoom !== null) params.set('zoom', zoom);
+        
+        fetch(`/api/peaks/${jobId}?${params}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to fetch waveform: ${response.statusText}`);
+                }
+                
+                waveform.zoom = parseInt(response.headers.get('X-Peaks-Zoom'));
+                waveform.levels = parseInt(response.headers.get('X-Peaks-Levels'));
+                waveform.duration = parseFloat(response.headers.get('X-Peaks-Duration'));
+                waveform.secondsPerPeak = parseInt(response.headers.get('X-Peaks-Samples-Per-Peak')) /
+                    parseInt(response.headers.get('X-Peaks-Sample-Rate'));
+                waveform.peaksStart = parseFloat(response.headers.get('X-Peaks-Start'));
+                
+                return response.arrayBuffer();
+            })
+            .then(buffer => {
+                waveform.start = start;
+                waveform.end = end !== null ? end : waveform.duration;
+                waveform.peaks = new Int8Array(buffer);
+                
+                waveformContainer.classList.remove('d-none');
+                drawWaveform();
+            })
+            .catch(error => {
+                // The waveform is optional, results remain usable without it
+                console.error('Waveform fetch error:', error);
+            });
+    }
+    
+    /**
+     * Draw the loaded min/max peaks on the waveform canvas
+     */
+    function drawWaveform() {
+        const width = waveformCanvas.clientWidth;
+        const height = waveformCanvas.height;
+        waveformCanvas.width = width;
+        
+        const ctx = waveformCanvas.getContext('2d');
+        ctx.clearRect(0, 0, width, height);
+        ctx.fillStyle = getComputedStyle(document.documentElement).getPropertyValue('--bs-primary') || '#0d6efd';
+        
+        const peaks = waveform.peaks;
+        const peakCount = peaks.length / 2;
+        const secondsPerPixel = (waveform.end - waveform.start) / width;
+        
+        // Reduce peaks to one min/max column per pixel
+        for (let x = 0; x < width; x++) {
+            const from = Math.floor((waveform.start + x * secondsPerPixel - waveform.peaksStart) / waveform.secondsPerPeak);
+            const to = Math.max(from + 1, Math.floor((waveform.start + (x + 1) * secondsPerPixel - waveform.peaksStart) / waveform.secondsPerPeak));
+            
+            let min = 127, max = -127;
+            for (let i = Math.max(from, 0); i < Math.min(to, peakCount); i++) {
+                min = Math.min(min, peaks[i * 2]);
+                max = Math.max(max, peaks[i * 2 + 1]);
+            }
+            if (min > max) continue;
+            
+            const top = (1 - (max + 127) / 254) * height;
+            const bottom = (1 - (min + 127) / 254) * height;
+            ctx.fillRect(x, top, 1, Math.max(1, bottom - top));
+        }
+        
+        if (waveformRange) {
+            waveformRange.textContent = `${formatTime(waveform.start)} - ${formatTime(waveform.end)}`;
+        }
+    }
+    
+    /**
+     * Zoom the waveform in or out around the center of the visible window
+     */
+    function zoomWaveform(step) {
+        if (waveform.zoom === null) return;
+        
+        const zoom = Math.min(Math.max(waveform.zoom + step, 0), waveform.levels - 1);
+        const center = (waveform.start + waveform.end) / 2;
+        const span = Math.min((waveform.end - waveform.start) * Math.pow(2, -step), waveform.duration);
+        const start = Math.min(Math.max(center - span / 2, 0), waveform.duration - span);
+        
+        loadWaveform(start, start + span, step > 0 ? zoom : null);
+    }
+    
+    document.getElementById('waveform-zoom-in')?.addEventListener('click', () => zoomWaveform(1));
+    document.getElementById('waveform-zoom-out')?.addEventListener('click', () => zoomWaveform(-1));
+    
+    // Play a few seconds of audio from the clicked position
+    waveformCanvas?.addEventListener('click', function(e) {
+        if (waveform.end === null) return;
+        
+        const rect = waveformCanvas.getBoundingClientRect();
+        const time = waveform.start + (e.clientX - rect.left) / rect.width * (waveform.end - waveform.start);
+        playAudioSegment(jobId, time, Math.min(time + 5, waveform.duration));
+    });
+    
+    window.addEventListener('resize', () => {
+        if (waveform.peaks) drawWaveform();
+    });
+    
     /**
      * Hide loading spinner
      */
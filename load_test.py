@@ -0,0 +1,337 @@
+"""
+End-to-end HTTP load test for the transcription API
+
+Drives the real routes (upload, transcribe, status, results, download,
+segment_audio) with concurrent virtual clients and reports latency
+percentiles, error rates and event loop blocking time per endpoint.
+
+By default a server is started with the deterministic stub ASR engine and the
+loop monitor enabled, using a temporary upload directory and database:
+
+    python load_test.py --clients 200 --audio-seconds 60
+
+Use --base-url to target a running server instead (start it with
+ASR_ENGINE=stub and LOOP_MONITOR=true to get loop blocking statistics).
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import wave
+import shutil
+import socket
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DOWNLOAD_FORMATS = ["csv", "srt", "vtt", "json", "lrc"]
+
+def endpoint_key(path: str) -> str:
+    """
+    Group a request path by endpoint like the server's loop monitor, dropping job IDs and other parameters
+
+    Copied from app.core.loop_monitor, importing the app package would set up its routes, model and database
+    """
+    parts = [part for part in path.split("/") if part]
+    if not parts:
+        return "/"
+
+    if parts[0] == "api":
+        return "/" + "/".join(parts[:2])
+
+    return "/" + parts[0]
+
+def generate_wav(duration: float, seed: int, sampling_rate: int = 16000) -> bytes:
+    """
+    Generate a deterministic mono 16-bit WAV file
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sampling_rate)) / sampling_rate
+    signal = 0.3 * np.sin(2 * np.pi * (200 + seed % 300) * t) + 0.05 * rng.standard_normal(len(t))
+    samples = (np.clip(signal, -1.0, 1.0) * 32767).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sampling_rate)
+        f.writeframes(samples.tobytes())
+
+    return buffer.getvalue()
+
+def encode_multipart(field: str, filename: str, content: bytes,
+                     fields: Optional[Dict[str, str]] = None) -> Tuple[bytes, str]:
+    """
+    Encode a file upload and optional form fields as multipart/form-data
+    """
+    boundary = uuid.uuid4().hex
+    body = "".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        for name, value in (fields or {}).items()
+    ).encode() + (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class LoadTestClient:
+    """
+    HTTP client that records latency and errors per endpoint
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                content_type: Optional[str] = None) -> Tuple[int, bytes]:
+        """
+        Send a request and record its latency under the endpoint of the path
+        """
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        if content_type:
+            req.add_header("Content-Type", content_type)
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except Exception:
+            status, payload = 0, b""
+
+        self.record(endpoint_key(path.split("?")[0]), time.perf_counter() - start, 200 <= status < 300)
+        return status, payload
+
+    def record(self, endpoint: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(latency)
+            self.errors.setdefault(endpoint, 0)
+            if not ok:
+                self.errors[endpoint] += 1
+
+def run_scenario(client: LoadTestClient, client_index: int, session_id: int, args: argparse.Namespace) -> bool:
+    """
+    Run one upload-to-download session and return whether it completed
+    """
+    rng = random.Random(args.seed + session_id)
+    audio = generate_wav(args.audio_seconds, args.seed + session_id)
+
+    # Each virtual client is its own scheduling client unless they share one on purpose,
+    # otherwise all would be capped together as the harness's address
+    client_id = "loadtest" if args.shared_client_id else f"loadtest-{client_index}"
+    body, content_type = encode_multipart("file", f"session_{session_id}.wav", audio, {"client_id": client_id})
+    status, payload = client.request("POST", "/api/upload", body, content_type)
+    if status != 200:
+        return False
+    job_id = json.loads(payload)["job_id"]
+
+    status, _ = client.request("POST", f"/api/transcribe/{job_id}")
+    if status != 200:
+        return False
+
+    deadline = time.monotonic() + args.job_timeout
+    while True:
+        status, payload = client.request("GET", f"/api/status/{job_id}")
+        job_status = json.loads(payload).get("status") if status == 200 else None
+
+        if job_status == "completed":
+            break
+        if job_status == "failed" or time.monotonic() > deadline:
+            return False
+
+        time.sleep(args.poll_interval)
+
+    status, payload = client.request("GET", f"/api/results/{job_id}")
+    if status != 200:
+        return False
+    segments = json.loads(payload).get("results", {}).get("segments", [])
+
+    client.request("GET", f"/api/download/{job_id}/{rng.choice(DOWNLOAD_FORMATS)}")
+
+    if segments:
+        segment = rng.choice(segments)
+        client.request(
+            "GET",
+            f"/api/segment_audio/{job_id}?start_time={segment['start']:.3f}&end_time={segment['end']:.3f}"
+        )
+
+    return True
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+def build_report(client: LoadTestClient, loop_stats: Optional[Dict[str, Any]],
+                 elapsed: float, completed: int, sessions: int) -> Dict[str, Any]:
+    """
+    Summarize latency, error rate and loop blocking per endpoint
+    """
+    endpoints = {}
+    loop_endpoints = loop_stats["endpoints"] if loop_stats else {}
+
+    for endpoint in sorted(set(client.samples) | set(loop_endpoints)):
+        latencies = client.samples.get(endpoint, [])
+        errors = client.errors.get(endpoint, 0)
+        blocking = loop_endpoints.get(endpoint, {})
+
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": errors / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0.0,
+            "loop_blocking_seconds": blocking.get("blocking_seconds"),
+            "loop_max_blocking_seconds": blocking.get("max_blocking_seconds"),
+            "loop_slow_callbacks": blocking.get("slow_callbacks")
+        }
+
+    return {
+        "elapsed_seconds": elapsed,
+        "sessions": sessions,
+        "completed_sessions": completed,
+        "endpoints": endpoints
+    }
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['completed_sessions']}/{report['sessions']} sessions completed "
+          f"in {report['elapsed_seconds']:.1f}s\n")
+
+    header = f"{'endpoint':<22}{'reqs':>7}{'err%':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'block ms':>10}{'blk max':>9}{'slow':>6}"
+    print(header)
+    print("-" * len(header))
+
+    for endpoint, stats in report["endpoints"].items():
+        blocking = stats["loop_blocking_seconds"]
+        blocking_max = stats["loop_max_blocking_seconds"]
+        print(
+            f"{endpoint:<22}{stats['requests']:>7}{stats['error_rate'] * 100:>7.1f}"
+            f"{stats['p50'] * 1000:>9.1f}{stats['p95'] * 1000:>9.1f}{stats['p99'] * 1000:>9.1f}{stats['max'] * 1000:>9.1f}"
+            f"{(blocking or 0) * 1000:>10.1f}{(blocking_max or 0) * 1000:>9.1f}{stats['loop_slow_callbacks'] or 0:>6}"
+        )
+
+def find_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_stub_server(args: argparse.Namespace, work_dir: Path) -> Tuple[subprocess.Popen, str]:
+    """
+    Start the application with the stub ASR engine in a subprocess
+    """
+    port = find_free_port()
+    env = dict(
+        os.environ,
+        ASR_ENGINE="stub",
+        STUB_ASR_LATENCY=str(args.stub_latency),
+        LOOP_MONITOR="true",
+        UPLOAD_DIR=str(work_dir / "uploads"),
+        DATABASE_URL=f"sqlite:///{work_dir / 'loadtest.db'}",
+        STORAGE_GC_INTERVAL="0"
+    )
+
+    # The loop monitor instruments the asyncio loop, so uvloop must not be used
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--loop", "asyncio", "--log-level", "warning", "--no-access-log"],
+        cwd=Path(__file__).resolve().parent,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            urllib.request.urlopen(base_url + "/api/debug/loop_stats", timeout=1)
+            return process, base_url
+        except Exception:
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("Server did not start within 30 seconds")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the transcription API")
+    parser.add_argument("--base-url", help="Target a running server instead of starting a stub server")
+    parser.add_argument("--clients", type=int, default=50, help="Number of concurrent clients")
+    parser.add_argument("--sessions", type=int, default=1, help="Upload-to-download sessions per client")
+    parser.add_argument("--audio-seconds", type=float, default=30.0, help="Duration of the generated audio")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between status polls")
+    parser.add_argument("--job-timeout", type=float, default=600.0, help="Seconds to wait for a job to complete")
+    parser.add_argument("--request-timeout", type=float, default=60.0, help="Seconds to wait for a response")
+    parser.add_argument("--stub-latency", type=float, default=0.01, help="Stub inference seconds per audio second")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated audio and client choices")
+    parser.add_argument("--shared-client-id", action="store_true",
+                        help="Send one client_id for all virtual clients, subject to the per-client job cap")
+    parser.add_argument("--json", type=Path, help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    work_dir = None
+    process = None
+    base_url = args.base_url
+
+    if not base_url:
+        work_dir = Path(tempfile.mkdtemp(prefix="loadtest_"))
+        process, base_url = start_stub_server(args, work_dir)
+
+    try:
+        client = LoadTestClient(base_url, args.request_timeout)
+        client.request("DELETE", "/api/debug/loop_stats")
+        client.samples.clear()
+        client.errors.clear()
+
+        def run_client(client_index: int) -> int:
+            return sum(
+                run_scenario(client, client_index, client_index * args.sessions + i, args)
+                for i in range(args.sessions)
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            completed = sum(executor.map(run_client, range(args.clients)))
+        elapsed = time.perf_counter() - start
+
+        loop_stats = None
+        try:
+            with urllib.request.urlopen(base_url + "/api/debug/loop_stats", timeout=args.request_timeout) as response:
+                loop_stats = json.loads(response.read())
+        except Exception:
+            print("Loop monitor is not enabled on the target server", file=sys.stderr)
+
+        report = build_report(client, loop_stats, elapsed, completed, args.clients * args.sessions)
+        print_report(report)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
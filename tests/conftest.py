@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Settings and the database engine are created on import, so point them at a
+# scratch directory before any app module is loaded
+TEST_DIR = tempfile.mkdtemp(prefix="transcription_tests_")
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["ASR_ENGINE"] = "stub"
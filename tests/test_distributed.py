@@ -0,0 +1,112 @@
+import time
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.core.models import TranscriptionJob, JobStatus, db_session, init_db
+from app.core.distributed import claim_job, renew_leases, release_job
+from app.core.transcription import check_lease, LeaseLost, LOST_LEASES
+
+@pytest.fixture(autouse=True)
+def clean_jobs():
+    init_db()
+    db_session.query(TranscriptionJob).delete()
+    db_session.commit()
+    yield
+    db_session.remove()
+
+def create_job(status: JobStatus = JobStatus.QUEUED, **fields) -> str:
+    job_id = str(uuid.uuid4())
+    db_session.add(TranscriptionJob(
+        id=job_id,
+        filename="audio.wav",
+        file_path=f"{job_id}/audio.wav",
+        status=status,
+        created_at=time.time(),
+        **fields
+    ))
+    db_session.commit()
+    return job_id
+
+def get_job(job_id: str) -> TranscriptionJob:
+    db_session.expire_all()
+    return TranscriptionJob.get_by_id(job_id)
+
+def test_queued_job_is_claimed_once():
+    job_id = create_job()
+
+    assert claim_job("node-a") == job_id
+    assert claim_job("node-b") is None
+
+    job = get_job(job_id)
+    assert job.status == JobStatus.PREPROCESSING
+    assert job.lease_owner == "node-a"
+    assert job.attempts == 1
+
+def test_higher_priority_job_is_claimed_first():
+    create_job(priority=0)
+    urgent_id = create_job(priority=2)
+
+    assert claim_job("node-a") == urgent_id
+
+def test_expired_lease_is_reclaimed_by_another_node():
+    job_id = create_job()
+    claim_job("node-a")
+
+    # A live lease is not claimable
+    assert claim_job("node-b") is None
+
+    db_session.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).update(
+        {TranscriptionJob.lease_expires_at: time.time() - 1}, synchronize_session=False
+    )
+    db_session.commit()
+
+    assert claim_job("node-b") == job_id
+    job = get_job(job_id)
+    assert job.lease_owner == "node-b"
+    assert job.attempts == 2
+
+    # The previous owner can no longer renew the lease or write the job
+    assert renew_leases("node-a", {job_id}) == set()
+    assert renew_leases("node-b", {job_id}) == {job_id}
+    with pytest.raises(LeaseLost):
+        check_lease(job_id, "node-a")
+    check_lease(job_id, "node-b")
+    db_session.commit()
+
+def test_job_fails_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_JOB_ATTEMPTS", 2)
+    job_id = create_job(
+        status=JobStatus.PROCESSING,
+        lease_owner="node-a",
+        lease_expires_at=time.time() - 1,
+        attempts=2
+    )
+
+    assert claim_job("node-b") is None
+
+    job = get_job(job_id)
+    assert job.status == JobStatus.FAILED
+    assert job.lease_owner is None
+
+def test_release_only_by_owner():
+    job_id = create_job()
+    claim_job("node-a")
+
+    release_job("node-b", job_id)
+    assert get_job(job_id).lease_owner == "node-a"
+
+    release_job("node-a", job_id)
+    assert get_job(job_id).lease_owner is None
+
+def test_lost_lease_flag_stops_job():
+    job_id = create_job()
+    claim_job("node-a")
+
+    LOST_LEASES.add(job_id)
+    try:
+        with pytest.raises(LeaseLost):
+            check_lease(job_id, "node-a")
+    finally:
+        LOST_LEASES.discard(job_id)
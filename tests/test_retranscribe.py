@@ -0,0 +1,31 @@
+from app.core.transcription import splice_segments
+
+def bounds(segments):
+    return [(segment["start"], segment["end"]) for segment in segments]
+
+def test_new_segments_crossing_range_edges_are_cut_at_the_edges():
+    old = [
+        {"start": 0.0, "end": 10.0, "text": "a b"},
+        {"start": 10.0, "end": 20.0, "text": "c d"},
+        {"start": 20.0, "end": 30.0, "text": "e f"}
+    ]
+    new = [
+        {"start": 6.0, "end": 12.0, "text": "one two three"},
+        {"start": 12.0, "end": 17.0, "text": "four five"},
+        {"start": 17.0, "end": 25.0, "text": "six seven eight nine"}
+    ]
+
+    result = splice_segments(old, new, 10.0, 20.0)
+
+    # No audio in the range loses its text and nothing outside it is duplicated
+    assert bounds(result) == [(0.0, 10.0), (10.0, 12.0), (12.0, 17.0), (17.0, 20.0), (20.0, 30.0)]
+    assert " ".join(segment["text"] for segment in result) == "a b three four five six seven e f"
+
+def test_old_segment_spanning_range_is_split():
+    old = [{"start": 0.0, "end": 30.0, "text": "one two three four five six"}]
+    new = [{"start": 10.0, "end": 20.0, "text": "new words"}]
+
+    result = splice_segments(old, new, 10.0, 20.0)
+
+    assert [segment["text"] for segment in result] == ["one two", "new words", "five six"]
+    assert result[0]["end"] <= 10.0 and result[2]["start"] >= 20.0
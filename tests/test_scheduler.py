@@ -0,0 +1,23 @@
+from app.core.scheduler import FairQueue
+
+def test_busy_client_is_tagged_after_idle_one():
+    queue = FairQueue()
+    busy = queue.tag("busy", 5.0, 1.0)
+    idle = queue.tag("idle", 1.0, 1.0)
+    queue.served(idle)
+    queue.served(busy)
+
+    assert queue.tag("busy", 1.0, 1.0) == busy + 5.0
+    assert queue.tag("idle", 1.0, 1.0) == idle + 1.0
+
+def test_finished_clients_are_forgotten():
+    queue = FairQueue()
+    for i in range(100):
+        queue.served(queue.tag(f"client-{i}", 1.0, 1.0))
+        queue.served(queue.tag("busy", 1.0, 1.0))
+
+    assert len(queue._client_finish) <= 2
+
+    queue.idle()
+    assert queue._client_finish == {}
+    assert queue.tag("new", 1.0, 1.0) == queue.virtual_time
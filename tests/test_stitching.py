@@ -0,0 +1,36 @@
+from app.core.transcription import stitch_segments
+
+def stitched_text(segments):
+    return " ".join(segment["text"] for segment in segments)
+
+def test_matching_words_are_kept_once():
+    previous = [
+        {"start": 20.0, "end": 24.0, "text": "we need to"},
+        {"start": 24.0, "end": 30.0, "text": "hire two more engineers"}
+    ]
+    segments = [{"start": 28.0, "end": 34.0, "text": "more engineers for the team"}]
+
+    result = stitch_segments(previous, segments, 28.0, 30.0)
+
+    assert stitched_text(result) == "we need to hire two more engineers for the team"
+    assert result[0] is previous[0]
+
+def test_cut_off_word_is_dropped_without_match():
+    # The previous window ends in the middle of "hire", so no two words match
+    previous = [{"start": 22.0, "end": 30.0, "text": "the plan for next quarter is to hi"}]
+    segments = [{"start": 28.0, "end": 34.0, "text": "to hire two more engineers"}]
+
+    result = stitch_segments(previous, segments, 28.0, 30.0)
+    words = stitched_text(result).split()
+
+    assert "hi" not in words
+    assert "hire" in words
+    assert words[-4:] == ["hire", "two", "more", "engineers"]
+
+def test_segments_outside_overlap_are_untouched():
+    previous = [{"start": 0.0, "end": 10.0, "text": "first part"}]
+    segments = [{"start": 31.0, "end": 35.0, "text": "second part"}]
+
+    result = stitch_segments(previous, segments, 28.0, 30.0)
+
+    assert result == previous + segments
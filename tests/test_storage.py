@@ -0,0 +1,74 @@
+import os
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.core.models import TranscriptionJob, JobStatus, db_session, init_db
+from app.core.storage import StorageManager, LAST_ACCESS_MARKER
+
+DAY = 24 * 3600
+
+@pytest.fixture(autouse=True)
+def storage_settings(monkeypatch):
+    init_db()
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 0)
+    monkeypatch.setattr(settings, "DERIVED_ARTIFACT_TTL", 1 * DAY)
+    monkeypatch.setattr(settings, "PROCESSED_AUDIO_TTL", 7 * DAY)
+    monkeypatch.setattr(settings, "JOB_TTL", 30 * DAY)
+
+def create_job(created_at: float) -> Path:
+    job_id = str(uuid.uuid4())
+    job_dir = Path(settings.UPLOAD_DIR) / job_id
+    os.makedirs(job_dir)
+
+    for name in ("audio.wav", "results.json", "transcription.srt", "processed_audio.flac", LAST_ACCESS_MARKER):
+        (job_dir / name).write_bytes(b"data")
+        os.utime(job_dir / name, (created_at, created_at))
+
+    db_session.add(TranscriptionJob(
+        id=job_id,
+        filename="audio.wav",
+        file_path=str(job_dir / "audio.wav"),
+        status=JobStatus.COMPLETED,
+        created_at=created_at,
+        updated_at=created_at
+    ))
+    db_session.commit()
+
+    return job_dir
+
+def test_expiry_does_not_restart_ttls():
+    # Created in the past, so deletions made by the collector happen "later" than every pass
+    created_at = time.time() - 60 * DAY
+    job_dir = create_job(created_at)
+    manager = StorageManager()
+
+    manager.collect(now=created_at + 2 * DAY)
+    assert not (job_dir / "transcription.srt").exists()
+    assert (job_dir / "processed_audio.flac").exists()
+
+    manager.collect(now=created_at + 8 * DAY)
+    assert not (job_dir / "processed_audio.flac").exists()
+    assert (job_dir / "results.json").exists()
+
+    report = manager.collect(now=created_at + 31 * DAY)
+    assert job_dir.name in report["deleted_jobs"]
+    assert not job_dir.exists()
+
+def test_quota_eviction_keeps_jobs_unless_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 1)
+    monkeypatch.setattr(settings, "JOB_TTL", 0)
+    job_dir = create_job(time.time())
+    manager = StorageManager()
+
+    report = manager.collect()
+    assert not (job_dir / "processed_audio.flac").exists()
+    assert (job_dir / "results.json").exists()
+    assert job_dir.name not in report["deleted_jobs"]
+
+    monkeypatch.setattr(settings, "QUOTA_EVICT_JOBS", True)
+    report = manager.collect()
+    assert job_dir.name in report["deleted_jobs"]
@@ -0,0 +1,12 @@
+"""
+分散実行モード（JOB_EXECUTION=distributed）で文字起こしジョブを処理するワーカーノード
+"""
+from app.core.models import init_db
+from app.core.distributed import Worker
+
+if __name__ == "__main__":
+    init_db()
+    
+    worker = Worker()
+    worker.install_signal_handlers()
+    worker.run()